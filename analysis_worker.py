@@ -0,0 +1,241 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from .config import ANALYSIS_RING_SLOTS, ANALYSIS_TIMEOUT, TRACKING_ENABLED, CONFIDENCE_THRESHOLD, IDENTITY_CACHE_MARGIN
+
+# Cascade and model load in the child; allow for a large model on a cold disk
+WORKER_START_TIMEOUT = 30
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class TrackResult:
+    """What the worker reports per face: enough for the lock rules, nothing more"""
+    __slots__ = ("track_id", "box", "identity", "fresh")
+
+    def __init__(self, track_id, box, identity, fresh=False):
+        self.track_id = track_id
+        self.box = box
+        self.identity = identity
+        # True when the identity was predicted on this frame rather than carried over
+        self.fresh = fresh
+
+
+def _worker_main(shm_name, slots, shape, model_path, user_id, requests, results):
+    """Worker process: tracking + recognition on frames read straight from the shared ring"""
+    from .detector import FaceDetector
+    from .tracker import FaceTracker
+    from .recognition_budget import RecognitionBudget
+    from .recognizer import create_recognizer
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        ring = np.ndarray((slots,) + shape, dtype=np.uint8, buffer=shm.buf)
+        recognizer = None
+        if model_path:
+            recognizer = create_recognizer()
+            recognizer.read(model_path)
+        detector = FaceDetector(scale_factor=1.2, min_neighbors=5)
+        if TRACKING_ENABLED:
+            tracker = FaceTracker(detector.detect)
+            budget = RecognitionBudget()
+        else:
+            tracker = FaceTracker(detector.detect, redetect_interval=1, reuse_identity=False)
+            budget = RecognitionBudget(max_faces=0, budget_ms=0)
+        results.put(("ready", None, None))
+
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            seq, slot, now = request
+            # The main process never rewrites a slot until its result is back, but copy anyway:
+            # tracking keeps no reference and the copy is a single memcpy
+            gray = ring[slot].copy()
+
+            started = time.perf_counter()
+            faces = tracker.update(gray, now)
+            detect_s = time.perf_counter() - started
+
+            predict_s = [0.0]
+            fresh = set()
+            def predict(track):
+                x, y, w, h = track.box
+                t0 = time.perf_counter()
+                label, confidence = recognizer.predict(gray[y:y+h, x:x+w])
+                # Same caching rule as Sentinel.is_confident_match
+                track.set_identity(label, confidence,
+                                   cacheable=label == user_id and confidence < CONFIDENCE_THRESHOLD - IDENTITY_CACHE_MARGIN)
+                fresh.add(track.track_id)
+                predict_s[0] += time.perf_counter() - t0
+            if recognizer is not None:
+                budget.run(faces, gray.shape, predict)
+
+            records = [(t.track_id, t.box, tuple(t.identity) if t.identity is not None else None, t.track_id in fresh)
+                       for t in faces]
+            results.put((seq, records, (detect_s, predict_s[0])))
+    finally:
+        shm.close()
+
+
+class AnalysisWorker:
+    """Runs detection and recognition in a child process; frames go through preallocated shared memory
+
+    The caller keeps all lock state. analyze() returns TrackResults, or None when the worker
+    cannot answer for this frame (still starting, restarting or failed) and the caller should
+    analyze it itself. Starting and stopping processes happens on background threads, so
+    analyze() never waits longer than one result timeout.
+    """
+
+    def __init__(self, model_path=None, user_id=None, slots=ANALYSIS_RING_SLOTS, timeout=ANALYSIS_TIMEOUT):
+        self.model_path = model_path
+        self.user_id = user_id
+        self.slots = slots
+        self.timeout = timeout
+        self._ctx = mp.get_context("spawn")
+        self.shape = None
+        self.shm = None
+        self.ring = None
+        self.process = None
+        self.requests = None
+        self.results = None
+        # Set once the current process has loaded its model; process/requests/results are valid then
+        self.ready = threading.Event()
+        self._starter = None
+        # Bumped whenever the current process is abandoned, so a late start is discarded
+        self._generation = 0
+        self.seq = 0
+        self.restarts = 0
+        self.failures = 0
+        self.disabled = False
+        self.last_worker_times = (0.0, 0.0)
+
+    def _allocate(self, shape):
+        # A new frame size needs a new ring; the old process is stopped without waiting on it
+        self._retire()
+        self._release_ring()
+        self.shape = shape
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * shape[0] * shape[1])
+        self.ring = np.ndarray((self.slots,) + shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def start(self):
+        """Launch a worker process; it is used once it reports ready"""
+        self.ready.clear()
+        self._generation += 1
+        args = (self.shm.name, self.slots, self.shape, self.model_path, self.user_id)
+        self._starter = threading.Thread(target=self._start, args=(self._generation, args),
+                                         name="AnalysisWorkerStart", daemon=True)
+        self._starter.start()
+
+    def _start(self, generation, args):
+        requests = self._ctx.Queue()
+        results = self._ctx.Queue()
+        process = self._ctx.Process(target=_worker_main, name="AnalysisWorker", daemon=True,
+                                    args=args + (requests, results))
+        process.start()
+        # Model load happens in the child; the caller analyzes in-process meanwhile
+        deadline = time.monotonic() + max(self.timeout, WORKER_START_TIMEOUT)
+        while time.monotonic() < deadline and process.is_alive():
+            try:
+                results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if generation != self._generation:
+                break
+            self.process, self.requests, self.results = process, requests, results
+            self.ready.set()
+            return
+        else:
+            print("[AnalysisWorker] Worker did not become ready.")
+        _stop_process(process, requests)
+
+    def wait_ready(self, timeout=WORKER_START_TIMEOUT):
+        """Block until the worker can take frames (benchmarks; the Sentinel never waits)"""
+        return self.ready.wait(timeout)
+
+    def restart(self):
+        self.restarts += 1
+        self.failures += 1
+        self._retire()
+        if self.failures > MAX_CONSECUTIVE_FAILURES:
+            # Something is wrong with the worker itself; callers keep analyzing in-process
+            print("[AnalysisWorker] Worker keeps failing; disabled.")
+            self.disabled = True
+            return
+        print(f"[AnalysisWorker] Restarting worker (#{self.restarts})")
+        self.start()
+
+    def _retire(self):
+        """Drop the current process and stop it in the background"""
+        self.ready.clear()
+        self._generation += 1
+        process, requests = self.process, self.requests
+        self.process = self.requests = self.results = None
+        if process is not None:
+            threading.Thread(target=_stop_process, args=(process, requests),
+                             name="AnalysisWorkerStop", daemon=True).start()
+
+    def analyze(self, gray, now=None):
+        if self.disabled:
+            return None
+        if gray.shape != self.shape or self.shm is None:
+            self._allocate(gray.shape)
+            self.start()
+            return None
+        if not self.ready.is_set():
+            if not self._starter.is_alive():
+                # The last start gave up without the worker reporting ready
+                self.restart()
+            return None
+        if not self.process.is_alive():
+            self.restart()
+            return None
+
+        self.seq += 1
+        slot = self.seq % self.slots
+        self.ring[slot] = gray
+        self.requests.put((self.seq, slot, time.monotonic() if now is None else now))
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                # Short waits so a crashed worker is noticed at once rather than after the full timeout
+                seq, records, worker_times = self.results.get(timeout=min(0.05, max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                if self.process.is_alive() and time.monotonic() < deadline:
+                    continue
+                self.restart()
+                return None
+            # Results of frames abandoned before a timeout are dropped
+            if seq == self.seq:
+                break
+        self.failures = 0
+        self.last_worker_times = worker_times
+        return [TrackResult(*record) for record in records]
+
+    def close(self):
+        self.ready.clear()
+        self._generation += 1
+        _stop_process(self.process, self.requests)
+        self.process = self.requests = self.results = None
+        self._release_ring()
+
+    def _release_ring(self):
+        if self.shm is not None:
+            self.ring = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+        self.shape = None
+
+
+def _stop_process(process, requests):
+    if process is None or not process.is_alive():
+        return
+    requests.put(None)
+    process.join(timeout=2)
+    if process.is_alive():
+        process.terminate()
+        process.join(timeout=2)
@@ -1,10 +1,10 @@
 import hashlib
 import uuid
-import cv2
 import os
 import numpy as np
-from PIL import Image
-from .config import TRAINER_PATH, FACES_DIR, CASCADE_PATH
+from .config import TRAINER_PATH, MODELS_DIR, IMPOSTOR_LABEL, IMPOSTOR_SAMPLES_PER_SHARD
+from .sample_store import get_sample_store
+from .recognizer import create_recognizer, model_file
 
 class AuthManager:
     @staticmethod
@@ -24,53 +24,110 @@ class AuthManager:
         return uuid.getnode() == registered_mac
 
     @staticmethod
-    def save_face_samples(user_id, name, images):
-        """Save captured face images for training"""
-        safe_name = "".join(x for x in name if x.isalnum())
-        user_dir = os.path.join(FACES_DIR, f"User_{user_id}_{safe_name}")
-        os.makedirs(user_dir, exist_ok=True)
-        
-        detector = cv2.CascadeClassifier(CASCADE_PATH)
-        count = 0
-        
-        for img in images:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = detector.detectMultiScale(gray, 1.3, 5)
-            for (x,y,w,h) in faces:
-                cv2.imwrite(os.path.join(user_dir, f"{count}.jpg"), gray[y:y+h,x:x+w])
-                count += 1
-        
-        return count
+    def _user_id_from_folder(folder_name):
+        # Folder layout is 'User_{ID}_{Name}'
+        parts = folder_name.split('_')
+        if len(parts) < 2 or parts[0] != "User":
+            return None
+        try:
+            return int(parts[1])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def load_face_samples(user_id=None):
+        """Load saved face crops as (faces, ids), optionally for a single user"""
+        faces, ids = get_sample_store().load(user_id)
+        return list(faces), ids
+
+    @staticmethod
+    def trainer_path():
+        return model_file(TRAINER_PATH)
 
     @staticmethod
     def train_recognizer():
-        """Train LBPH Recognizer on all saved faces"""
-        recognizer = cv2.face.LBPHFaceRecognizer_create()
-        
-        faces = []
-        ids = []
-        
-        # Walk through FACES_DIR
-        for root, dirs, files in os.walk(FACES_DIR):
-            for file in files:
-                if file.endswith(".jpg"):
-                    path = os.path.join(root, file)
-                    # Extract ID from folder name 'User_{ID}_{Name}'
-                    folder_name = os.path.basename(os.path.dirname(path))
-                    try:
-                        # Split by underscore, ID is index 1 (User, ID, Name...)
-                        id_ = int(folder_name.split('_')[1])
-                    except:
-                        continue
-                        
-                    img_pil = Image.open(path).convert('L')
-                    image_np = np.array(img_pil, 'uint8')
-                    
-                    faces.append(image_np)
-                    ids.append(id_)
+        """Full rebuild: train the recognizer on all saved faces (maintenance only)"""
+        recognizer = create_recognizer()
+        faces, ids = AuthManager.load_face_samples()
         
         if len(faces) > 0:
             recognizer.train(faces, np.array(ids))
-            recognizer.save(TRAINER_PATH)
+            recognizer.save(AuthManager.trainer_path())
+            for user_id in sorted(set(int(i) for i in ids)):
+                AuthManager.train_user_shard(user_id)
             return True
         return False
+
+    @staticmethod
+    def update_recognizer(user_id):
+        """Enroll one user by training only their shard; the global model is left to 'maintenance.py rebuild-model'"""
+        # Sentinel loads the user's shard, so signup never parses or rewrites everyone else's histograms
+        return AuthManager.train_user_shard(user_id)
+
+    @staticmethod
+    def user_shard_path(user_id):
+        return model_file(os.path.join(MODELS_DIR, f"user_{user_id}.yml"))
+
+    @staticmethod
+    def train_user_shard(user_id):
+        """Small model with only this user's samples plus a background impostor set"""
+        faces, ids = AuthManager.load_face_samples(user_id)
+        if len(faces) == 0:
+            return False
+        faces = list(faces)
+        ids = list(ids)
+        
+        if IMPOSTOR_SAMPLES_PER_SHARD > 0:
+            # Pick from the index and read only the chosen rows, not every stored sample
+            store = get_sample_store()
+            pool = np.setdiff1d(store.positions(), store.positions(user_id))
+            if len(pool) > 0:
+                # Deterministic per user so rebuilding a shard reproduces it
+                rng = np.random.default_rng(user_id)
+                picked = rng.choice(pool, size=min(IMPOSTOR_SAMPLES_PER_SHARD, len(pool)), replace=False)
+                faces.extend(store.read(picked))
+                ids.extend([IMPOSTOR_LABEL] * len(picked))
+        
+        recognizer = create_recognizer()
+        recognizer.train(faces, np.array(ids))
+        recognizer.save(AuthManager.user_shard_path(user_id))
+        return True
+
+    @staticmethod
+    def recognizer_path(user_id=None):
+        """Model file Sentinel should use: the user's shard, else the global model; None if neither exists"""
+        paths = [AuthManager.trainer_path()]
+        if user_id is not None:
+            paths.insert(0, AuthManager.user_shard_path(user_id))
+        for path in paths:
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def load_recognizer(user_id=None):
+        """Recognizer for one user's shard, falling back to the global model; None if neither exists"""
+        path = AuthManager.recognizer_path(user_id)
+        if path is None:
+            return None
+        recognizer = create_recognizer()
+        recognizer.read(path)
+        return recognizer
+
+    @staticmethod
+    def forget_user(user_id):
+        """Drop a deleted user's shard and stored samples so they are never retrained"""
+        removed = AuthManager.remove_user_from_model(user_id)
+        samples = get_sample_store().remove_user(user_id)
+        return removed, samples
+
+    @staticmethod
+    def remove_user_from_model(user_id):
+        """Delete one user's shard; returns True if there was one"""
+        # The global model keeps their histograms until the next rebuild, which no longer sees their samples.
+        # It only backs users without a shard, and for them this label is an intruder anyway.
+        shard_path = AuthManager.user_shard_path(user_id)
+        if not os.path.exists(shard_path):
+            return False
+        os.remove(shard_path)
+        return True
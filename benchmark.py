@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+
+# Add src to path to import config
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+try:
+    from src.recognizer import create_recognizer
+    from src.sample_store import get_sample_store
+    from src.sentinel import Sentinel
+    from src.supervisor import SentinelSupervisor
+    from src.frame_source import SyntheticSource, VideoFileSource
+    from src.stats import StageStats
+    from src.config import SAMPLE_SIZE, ABSENCE_LOCK_TIMEOUT, GHOST_INPUT_THRESHOLD
+except ImportError:
+    # Fallback if running from root
+    from MedGuard_Core.src.recognizer import create_recognizer
+    from MedGuard_Core.src.sample_store import get_sample_store
+    from MedGuard_Core.src.sentinel import Sentinel
+    from MedGuard_Core.src.supervisor import SentinelSupervisor
+    from MedGuard_Core.src.frame_source import SyntheticSource, VideoFileSource
+    from MedGuard_Core.src.stats import StageStats
+    from MedGuard_Core.src.config import SAMPLE_SIZE, ABSENCE_LOCK_TIMEOUT, GHOST_INPUT_THRESHOLD
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3) if len(samples) else None
+
+def synthetic_faces(users, per_user, size=SAMPLE_SIZE, seed=0):
+    """Per-identity random textures plus noise; stands in for real crops on a fresh install"""
+    rng = np.random.default_rng(seed)
+    faces, labels = [], []
+    for user in range(1, users + 1):
+        base = rng.integers(0, 256, (size, size)).astype(np.float32)
+        for _ in range(per_user):
+            noisy = np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8)
+            faces.append(noisy)
+            labels.append(user)
+    return np.array(faces), np.array(labels, dtype=np.int32)
+
+def load_dataset(args):
+    faces, labels = get_sample_store().load()
+    if len(faces) == 0 or args.synthetic:
+        print(f"Using synthetic data ({args.users} users x {args.per_user} samples).")
+        return synthetic_faces(args.users, args.per_user)
+    print(f"Using {len(faces)} samples from the sample store.")
+    return faces, labels
+
+def bench_recognizers(args):
+    faces, labels = load_dataset(args)
+    # Hold out every 5th sample as a probe
+    probe = np.arange(len(faces)) % 5 == 0
+    train_faces, train_labels = list(faces[~probe]), labels[~probe]
+    probe_faces, probe_labels = list(faces[probe]), labels[probe]
+
+    report = {"samples": int(len(train_faces)), "probes": int(len(probe_faces)), "backends": {}}
+    predictions = {}
+    for backend in args.backends:
+        recognizer = create_recognizer(backend)
+        start = time.perf_counter()
+        recognizer.train(train_faces, train_labels)
+        train_s = time.perf_counter() - start
+
+        single = []
+        results = []
+        for face in probe_faces:
+            start = time.perf_counter()
+            results.append(recognizer.predict(face))
+            single.append(time.perf_counter() - start)
+
+        batch_s = None
+        if probe_faces:
+            start = time.perf_counter()
+            recognizer.predict_batch(probe_faces[:args.batch], k=args.k)
+            batch_s = (time.perf_counter() - start) / len(probe_faces[:args.batch])
+
+        predicted = np.array([int(label) for label, _ in results])
+        predictions[backend] = predicted
+        report["backends"][backend] = {
+            "train_s": round(train_s, 3),
+            "predict_ms_p50": percentile_ms(single, 50),
+            "predict_ms_p95": percentile_ms(single, 95),
+            "batch_ms_per_face": round(batch_s * 1000, 3) if batch_s is not None else None,
+            "rank1_accuracy": round(float((predicted == probe_labels).mean()), 4) if len(probe_labels) else None,
+        }
+
+    if len(predictions) == 2 and len(probe_labels):
+        a, b = predictions.values()
+        report["top1_agreement"] = round(float((a == b).mean()), 4)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+# --- Replay scenarios ---
+# Each scenario is a list of segments: (seconds, faces in view, synthetic input active).
+# 'user' is the enrolled user, 'other' any other enrolled identity.
+SCENARIOS = {
+    "user_present": {"segments": [(10, ["user"], False)], "event_at": None},
+    "user_leaves": {"segments": [(2, ["user"], False), (ABSENCE_LOCK_TIMEOUT + 3, [], False)], "event_at": 2},
+    "intruder": {"segments": [(2, ["user"], False), (5, ["user", "other"], False)], "event_at": 2},
+    "ghost_input": {"segments": [(2, ["user"], False), (GHOST_INPUT_THRESHOLD + 1, [], False), (3, [], True)],
+                    "event_at": 2 + GHOST_INPUT_THRESHOLD + 1},
+    "crowded": {"segments": [(2, ["user"], False), (5, ["user", "other", "other", "other"], False)], "event_at": 2},
+}
+
+def compose_frame(crops, size=(640, 480), face_px=180):
+    """Paste face crops side by side on a plain background"""
+    w, h = size
+    frame = np.full((h, w, 3), 110, dtype=np.uint8)
+    if not crops:
+        return frame
+    slot = w // len(crops)
+    side = min(face_px, slot - 10)
+    for i, crop in enumerate(crops):
+        # Haar needs some context around the tight training crop
+        padded = cv2.copyMakeBorder(crop, 20, 20, 20, 20, cv2.BORDER_REPLICATE)
+        face = cv2.resize(padded, (side, side))
+        x = i * slot + (slot - side) // 2
+        y = (h - side) // 2
+        frame[y:y + side, x:x + side] = cv2.cvtColor(face, cv2.COLOR_GRAY2BGR)
+    return frame
+
+def scenario_source(spec, user_crop, other_crops, fps):
+    timeline = []
+    for seconds, faces, input_active in spec["segments"]:
+        others = iter(other_crops)
+        crops = [user_crop if f == "user" else next(others) for f in faces]
+        frame = compose_frame(crops)
+        timeline.extend([(frame, input_active)] * int(seconds * fps))
+    source = SyntheticSource(lambda i: timeline[i][0], count=len(timeline), fps=fps, realtime=False)
+    return source, [active for _, active in timeline]
+
+def run_replay(name, source, input_flags, event_at, user_id, fps, analysis_mode="thread"):
+    locks = []
+    sentinel = Sentinel(user_id, lambda reason, path: locks.append(reason), lambda status: None, input_hooks=False,
+                        analysis_mode=analysis_mode)
+    # Keep every sample of the run rather than the live rolling window
+    sentinel.timings = StageStats(enabled=True, window=1 << 20)
+
+    t0 = time.monotonic()
+    sentinel.last_face_seen_time = t0
+    reads, totals, cpu = [], [], []
+    lock_at = None
+    source.open()
+    index = 0
+    while True:
+        start = time.perf_counter()
+        ret, frame = source.read()
+        reads.append(time.perf_counter() - start)
+        if not ret:
+            break
+        now = t0 + index / fps
+        if index < len(input_flags) and input_flags[index]:
+            sentinel.input.record("move")
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        sentinel.process_frame(frame, now=now)
+        totals.append(time.perf_counter() - start)
+        cpu.append(time.process_time() - cpu_start)
+
+        if locks and lock_at is None:
+            lock_at = now - t0
+        if index == 0 and sentinel.worker is not None:
+            # The worker starts in the background on the first frame; time it once it is up
+            sentinel.worker.wait_ready()
+        index += 1
+    source.release()
+    if sentinel.worker is not None:
+        sentinel.worker.close()
+
+    wall = sum(totals)
+    return {
+        "scenario": name,
+        "frames": len(totals),
+        "analysis_fps": round(len(totals) / wall, 1) if wall else None,
+        "cpu_ms_per_frame": round(1000 * sum(cpu) / len(cpu), 3) if cpu else None,
+        "stages_ms": {
+            stage: {"p50": percentile_ms(samples, 50), "p95": percentile_ms(samples, 95), "p99": percentile_ms(samples, 99)}
+            for stage, samples in [("read", reads)] + [
+                (stage, sentinel.timings.samples(stage)) for stage in sorted(sentinel.timings.stages)]
+        },
+        "full_detections": sentinel.tracker.full_detections,
+        "lock_reason": locks[0] if locks else None,
+        "locked_at_s": round(lock_at, 3) if lock_at is not None else None,
+        "event_to_lock_s": round(lock_at - event_at, 3) if lock_at is not None and event_at is not None else None,
+    }
+
+def bench_replay(args):
+    store = get_sample_store()
+    users = store.user_ids()
+    results = []
+
+    if args.video:
+        if args.user_id is None:
+            print("--video needs --user-id")
+            return
+        source = VideoFileSource(args.video, realtime=False)
+        source.open()
+        fps = source.fps
+        source.release()
+        results.append(run_replay("recorded", VideoFileSource(args.video, realtime=False), [], args.event_at, args.user_id, fps, args.analysis_mode))
+    else:
+        user_id = args.user_id if args.user_id is not None else (users[0] if users else None)
+        others = [u for u in users if u != user_id]
+        if user_id is None or not others:
+            print("Synthetic scenarios need at least two enrolled users in the sample store (or use --video).")
+            return
+        user_crop = store.load(user_id)[0][0]
+        other_crops = [store.load(u)[0][0] for u in (others * 3)[:3]]
+        for name in args.scenarios:
+            spec = SCENARIOS[name]
+            source, input_flags = scenario_source(spec, user_crop, other_crops, args.fps)
+            results.append(run_replay(name, source, input_flags, spec["event_at"], user_id, args.fps, args.analysis_mode))
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "fps": args.fps, "results": results}
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+def bench_sessions(args):
+    store = get_sample_store()
+    users = store.user_ids()
+    user_id = args.user_id if args.user_id is not None else (users[0] if users else 0)
+    crop = store.load(user_id)[0][0] if users else synthetic_faces(1, 1)[0][0]
+    frame = compose_frame([crop])
+
+    results = []
+    for count in args.sessions:
+        supervisor = SentinelSupervisor(workers=args.workers, input_hooks=False)
+        sentinels = [supervisor.add_session(f"screen{i}", user_id, lambda reason, path: None, lambda status: None,
+                                            frame_source=SyntheticSource(count=0))
+                     for i in range(count)]
+        for sentinel in sentinels:
+            sentinel.load_resources()
+            # Full detection every frame so the run measures the detector, not the tracker
+            sentinel.tracker.redetect_interval = 1
+
+        def drive(sentinel):
+            for _ in range(args.frames):
+                sentinel.process_frame(frame)
+
+        threads = [threading.Thread(target=drive, args=(s,)) for s in sentinels]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+        supervisor.stop()
+        results.append({"sessions": count, "workers": supervisor.workers,
+                        "aggregate_fps": round(count * args.frames / wall, 1),
+                        "per_session_fps": round(args.frames / wall, 1)})
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "frames_per_session": args.frames, "results": results}
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="MedGuard performance benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("recognizers", help="Compare recognizer backends on speed and accuracy")
+    p.add_argument("--backends", nargs="+", default=["opencv", "numpy"])
+    p.add_argument("--synthetic", action="store_true", help="Ignore the sample store and use synthetic faces")
+    p.add_argument("--users", type=int, default=50)
+    p.add_argument("--per-user", type=int, default=20)
+    p.add_argument("--batch", type=int, default=8, help="Faces per predict_batch call")
+    p.add_argument("-k", type=int, default=3, help="Matches returned per face in batch mode")
+    p.add_argument("--json", help="Also write the report to this file")
+    p.set_defaults(func=bench_recognizers)
+
+    p = sub.add_parser("replay", help="Feed recorded or synthetic clips through Sentinel with no camera or Tk")
+    p.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    p.add_argument("--fps", type=float, default=20.0, help="Virtual clock rate of synthetic clips")
+    p.add_argument("--user-id", type=int, help="Enrolled user the Sentinel guards (default: first in the store)")
+    p.add_argument("--video", help="Replay a recorded clip instead of the synthetic scenarios")
+    p.add_argument("--event-at", type=float, help="Seconds into --video when the lock-worthy event happens")
+    p.add_argument("--analysis-mode", choices=["thread", "process"], default="thread")
+    p.add_argument("--json", help="Also write the report to this file")
+    p.set_defaults(func=bench_replay)
+
+    p = sub.add_parser("sessions", help="Aggregate throughput of N supervised sessions sharing models and workers")
+    p.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--workers", type=int, help="Detection workers (default: CPU count)")
+    p.add_argument("--frames", type=int, default=200, help="Frames analyzed per session")
+    p.add_argument("--user-id", type=int)
+    p.add_argument("--json", help="Also write the report to this file")
+    p.set_defaults(func=bench_sessions)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
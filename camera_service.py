@@ -0,0 +1,157 @@
+import threading
+import time
+import cv2
+from .config import CAMERA_INDEX, CAMERA_IDLE_TIMEOUT
+from .frame_source import FrameSource, CameraSource, LatestFrameSlot
+
+
+class CameraService:
+    """Process-wide owner of the webcam; consumers subscribe for frames instead of opening it
+
+    The device is opened and warmed up once. It keeps being read after the last subscriber
+    leaves (so exposure stays settled across logout/login) and is released only after
+    idle_timeout seconds with nobody subscribed. Frames are shared: consumers must not
+    draw on them in place.
+    """
+
+    def __init__(self, index=CAMERA_INDEX, api=cv2.CAP_DSHOW, idle_timeout=CAMERA_IDLE_TIMEOUT, source=None):
+        self.source = source or CameraSource(index, api)
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._idle_since = None
+        self._reader = None
+        self._running = False
+        self.opened = False
+        self.opens = 0
+        self.frames_read = 0
+
+    def subscribe(self):
+        """New LatestFrameSlot fed with every frame from now on; starts the device if needed"""
+        slot = LatestFrameSlot()
+        with self._lock:
+            self._subscribers.append(slot)
+            self._idle_since = None
+            if self._reader is None:
+                self._running = True
+                self._reader = threading.Thread(target=self._run, name="CameraService", daemon=True)
+                self._reader.start()
+        return slot
+
+    def unsubscribe(self, slot):
+        with self._lock:
+            if slot in self._subscribers:
+                self._subscribers.remove(slot)
+            if not self._subscribers:
+                self._idle_since = time.monotonic()
+        slot.close()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _open(self):
+        if not self.source.open():
+            self.source.release()
+            return False
+        # Exposure settles once per device open, not once per consumer
+        for _ in range(self.source.warmup_frames):
+            self.source.read()
+        self.opened = True
+        self.opens += 1
+        return True
+
+    def _run(self):
+        released = False
+        try:
+            while self._running:
+                with self._lock:
+                    if not self._subscribers and self._idle_since is not None \
+                            and time.monotonic() - self._idle_since >= self.idle_timeout:
+                        # Release under the lock so a concurrent subscribe() starts a fresh reader
+                        self._release()
+                        released = True
+                        self._reader = None
+                        break
+                if not self.opened:
+                    if not self._open():
+                        print("Warning: Camera failed to open. Retrying...")
+                        time.sleep(1)
+                    continue
+                ret, frame = self.source.read()
+                if not ret:
+                    print("Warning: Camera read failed. Retrying...")
+                    time.sleep(1)
+                    continue
+                self.frames_read += 1
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for slot in subscribers:
+                    slot.put(frame)
+        finally:
+            if not released:
+                self._release()
+
+    def _release(self):
+        self.source.release()
+        self.opened = False
+
+    def close(self):
+        """Release the device now (app shutdown)"""
+        with self._lock:
+            self._running = False
+            reader, self._reader = self._reader, None
+            subscribers, self._subscribers = self._subscribers, []
+        for slot in subscribers:
+            slot.close()
+        if reader is not None:
+            reader.join(timeout=2)
+
+
+class SharedCameraSource(FrameSource):
+    """FrameSource backed by a CameraService subscription (already warm, so no warmup frames)"""
+    warmup_frames = 0
+    live = True
+
+    def __init__(self, service=None, index=CAMERA_INDEX, timeout=2.0):
+        self.service = service
+        self.index = index
+        self.timeout = timeout
+        self.slot = None
+
+    def open(self):
+        if self.service is None:
+            self.service = get_camera_service(self.index)
+        self.slot = self.service.subscribe()
+        return True
+
+    def read(self):
+        if self.slot is None:
+            return False, None
+        frame = self.slot.get(self.timeout)
+        if frame is None:
+            return False, None
+        return True, frame
+
+    def release(self):
+        if self.slot is not None:
+            self.service.unsubscribe(self.slot)
+            self.slot = None
+
+
+_services = {}
+_service_lock = threading.Lock()
+
+def get_camera_service(index=CAMERA_INDEX):
+    """One CameraService per device index"""
+    with _service_lock:
+        if index not in _services:
+            _services[index] = CameraService(index)
+        return _services[index]
+
+
+def shutdown_camera_service():
+    with _service_lock:
+        for service in _services.values():
+            service.close()
@@ -8,20 +8,122 @@ LOGS_DIR = os.path.join(BASE_DIR, "logs")
 BREACH_DIR = os.path.join(LOGS_DIR, "breach_images")
 SIGNUP_LOG_DIR = os.path.join(LOGS_DIR, "signup_images")
 TRAINER_PATH = os.path.join(BASE_DIR, "database", "trainer.yml")
+MODELS_DIR = os.path.join(BASE_DIR, "database", "models")  # Per-user recognizer shards
 FACES_DIR = os.path.join(BASE_DIR, "dataset")
+SAMPLE_STORE_PATH = os.path.join(FACES_DIR, "samples.bin")
+SAMPLE_INDEX_PATH = os.path.join(FACES_DIR, "samples_index.npy")
 
 # Ensure directories exist
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 os.makedirs(BREACH_DIR, exist_ok=True)
 os.makedirs(SIGNUP_LOG_DIR, exist_ok=True)
 os.makedirs(FACES_DIR, exist_ok=True)
+os.makedirs(MODELS_DIR, exist_ok=True)
+
+# Input Activity (coalesced pynput counters for ghost-input detection)
+INPUT_WINDOW = 5.0          # Seconds of per-iteration counts kept for rate queries
+INPUT_DISARM_AFTER = 2.0    # Verified this long -> stop listening to mouse moves
+INPUT_REARM_AFTER = 1.0     # Unverified this long -> listen to mouse moves again
+GHOST_INPUT_MIN_EVENTS = 1  # Input events in the last second that count as ghost input
+
+# Persistence (write-behind queue for non-critical writes)
+DB_FLUSH_INTERVAL = 2.0  # Max seconds a queued write waits before commit
+DB_BATCH_SIZE = 200      # Max queued writes per transaction
+
+# Security Event Journal
+EVENT_RETENTION_DAYS = 180  # Raw events older than this are folded into daily counts and deleted
+EVENT_PRUNE_CHUNK = 5000    # Rows deleted per transaction while pruning
 
 # System Constants
-MAX_BUFFER_SIZE = 30
+MAX_BUFFER_SIZE = 30  # Recent frames kept in the breach evidence ring buffer
 LOCKDOWN_TIMEOUT = 10  # Seconds allowed to re-authenticate
 GHOST_INPUT_THRESHOLD = 5  # Seconds of no face before input triggers lock
 ABSENCE_LOCK_TIMEOUT = 10 # Seconds of no face before auto-lock
 CAMERA_INDEX = 0
+CAMERA_IDLE_TIMEOUT = 30  # Seconds the shared camera stays open (and settled) after its last subscriber leaves
+
+# Analysis Scheduling (seconds budgeted per loop iteration for each named rate)
+SCHEDULER_RATES = {
+    "idle": 0.5,    # Verified user present and stable
+    "fast": 0.05,   # Unknown face or absence pending
+    "locked": 0.5,  # Low-power while the lock screen is up
+}
+IDLE_STABLE_SECONDS = 3  # Seconds of continuous verification before dropping to idle rate
+
+# Detection Resolution (detector runs on a downscaled copy, recognition on the full-res crop)
+DETECTION_WIDTH = 480             # Pixels; frames wider than this are shrunk before detection (0 = off)
+FACE_DISTANCE_RANGE = (0.35, 1.5) # Expected user distance from the camera in metres (near, far)
+CAMERA_HFOV_DEG = 60              # Horizontal field of view of a typical workstation webcam
+FACE_WIDTH_M = 0.15               # Average face width in metres
+
+# Face Tracking (full-frame detection only every N frames or when a track is lost)
+TRACKING_ENABLED = True
+TRACK_REDETECT_INTERVAL = 10  # Frames between full-frame detections...
+TRACK_REDETECT_SECONDS = 0.5  # ...but never longer than this, so newcomers are seen at slow rates too
+TRACK_SEARCH_MARGIN = 0.5     # Search window padding, as a fraction of the face size
+TRACK_MAX_DRIFT = 0.25        # Centre shift (fraction of face size) before identity is re-checked
+TRACK_REVERIFY_FRAMES = 30    # Re-run recognition on a settled face at least this often
+IDENTITY_CACHE_MARGIN = 25    # Only matches this far below CONFIDENCE_THRESHOLD are reused across frames
+
+# Motion Gate (reuse the last result while the scene matches the last analyzed frame)
+MOTION_GATE_ENABLED = True
+MOTION_WIDTH = 64               # Width of the block-averaged thumbnail that is compared
+MOTION_PIXEL_DELTA = 12         # Grey-level change for a thumbnail pixel to count as changed
+MOTION_CHANGED_FRACTION = 0.01  # Fraction of changed pixels that counts as motion
+MOTION_MAX_SKIP_SECONDS = 2.0   # Full re-check at least this often even on a static scene
+
+# Recognition Budget (per analyzed frame; faces over budget are predicted on the next frame)
+RECOGNITION_MAX_FACES = 3     # Predictions per frame
+RECOGNITION_BUDGET_MS = 40    # Stop predicting once this much time has gone (one face always runs)
+
+# Analysis Execution ("thread" = inside the Sentinel thread, "process" = worker process fed
+# through a shared-memory frame ring, so detection never competes with Tk for the GIL)
+ANALYSIS_MODE = "thread"
+ANALYSIS_RING_SLOTS = 4
+ANALYSIS_TIMEOUT = 2.0  # Seconds to wait for a worker result before restarting the worker
+
+# Dashboard Preview (independent of the analysis rate)
+PREVIEW_FPS = 15
+PREVIEW_SIZE = (320, 240)
+
+# Instrumentation (per-stage timing in Sentinel; the overlay shows it on the dashboard)
+STATS_ENABLED = True
+STATS_WINDOW = 256     # Samples kept per stage
+STATS_OVERLAY = False
+
+# Face Samples (fixed-size normalized grayscale crops in the packed store)
+SAMPLE_SIZE = 100
+
+# Enrollment (streamed capture; each crop must pass cheap quality gates before it is kept)
+ENROLL_TARGET_SAMPLES = 20    # Stop once this many good samples are collected...
+ENROLL_MIN_POSES = 3          # ...covering at least this many distinct position/size buckets
+ENROLL_MAX_FRAMES = 150       # Give up after this many frames
+ENROLL_MIN_SHARPNESS = 40.0   # Variance of the Laplacian on the normalized crop
+ENROLL_BRIGHTNESS_RANGE = (40, 215)
+ENROLL_DUPLICATE_DIFF = 4.0   # Mean abs difference of 16x16 thumbnails below which a crop is a repeat
+ENROLL_MAX_OFFCENTER = 0.3    # Face center offset from frame center, as a fraction of frame size
+
+# Dataset Maintenance ('maintenance.py curate-dataset')
+SAMPLE_CAP_PER_USER = 60     # Most diverse samples kept per user
+DEDUP_HAMMING_DISTANCE = 4   # dHash bits; crops at most this far apart are duplicates
+
+# Recognizer Backend ("opencv" = cv2.face LBPH, "numpy" = vectorized LBP histogram matcher)
+RECOGNIZER_BACKEND = "opencv"
+# The numpy backend saves a binary .lbph model and maps it instead of parsing it.
+# Saving a model unmaps every loaded copy of it first (Windows cannot replace a mapped file).
+MODEL_MMAP = True
+
+# Recognizer Shards (one small model per user plus a background impostor set)
+IMPOSTOR_LABEL = -1
+IMPOSTOR_SAMPLES_PER_SHARD = 60  # 0 disables the background set
+
+# Breach Evidence (written on a background thread after a lock)
+EVIDENCE_POST_FRAMES = 10    # Frames captured after the lock trigger
+EVIDENCE_FRAME_WIDTH = 320   # Ring buffer frames are downscaled to this width
+EVIDENCE_JPEG_QUALITY = 85
+
+# Model Cache (recognizers stay loaded across logout/login)
+MODEL_CACHE_SIZE = 4  # Users whose recognizers are kept warm
 
 # Security
 MAC_LOCK_ENABLED = True
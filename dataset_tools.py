@@ -0,0 +1,148 @@
+import os
+import shutil
+import time
+import cv2
+import numpy as np
+from .config import FACES_DIR, MODELS_DIR, SAMPLE_CAP_PER_USER, DEDUP_HAMMING_DISTANCE
+from .sample_store import get_sample_store
+from .model_cache import get_model_cache
+
+# Popcount of every byte value, for Hamming distances between packed hashes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(faces, size=8):
+    """64-bit difference hashes for a stack of grayscale crops: (N,) uint64"""
+    hashes = np.zeros(len(faces), dtype=np.uint64)
+    for i, face in enumerate(faces):
+        small = cv2.resize(face, (size + 1, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+        bits = (small[:, 1:] > small[:, :-1]).ravel()
+        hashes[i] = np.packbits(bits).view(">u8")[0]
+    return hashes
+
+
+def hamming(hashes, other):
+    """Bit distance from one hash to each of 'hashes'"""
+    x = np.bitwise_xor(hashes, np.uint64(other))
+    return _POPCOUNT[x.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def near_duplicates(hashes, sharpness, max_distance=DEDUP_HAMMING_DISTANCE):
+    """Positions (into hashes) to drop: each cluster keeps its sharpest crop"""
+    drop = np.zeros(len(hashes), dtype=bool)
+    kept = np.zeros(len(hashes), dtype=bool)
+    for i in np.argsort(-sharpness, kind="stable"):
+        if drop[i]:
+            continue
+        kept[i] = True
+        # Crops already kept are never dropped by a later, blurrier one
+        drop |= (hamming(hashes, hashes[i]) <= max_distance) & ~kept
+    return np.flatnonzero(drop)
+
+
+def diverse_subset(hashes, sharpness, cap):
+    """Greedy farthest-point pick of 'cap' positions, starting from the sharpest crop"""
+    if len(hashes) <= cap:
+        return np.arange(len(hashes))
+    chosen = [int(np.argmax(sharpness))]
+    nearest = hamming(hashes, hashes[chosen[0]]).astype(np.int32)
+    while len(chosen) < cap:
+        # Farthest from everything chosen so far; sharpness breaks ties
+        score = nearest * 1e6 + sharpness
+        score[chosen] = -1
+        pick = int(np.argmax(score))
+        chosen.append(pick)
+        nearest = np.minimum(nearest, hamming(hashes, hashes[pick]).astype(np.int32))
+    return np.array(sorted(chosen))
+
+
+def orphan_folders(known_ids, faces_dir=FACES_DIR):
+    """Legacy dataset/User_* folders whose user no longer exists"""
+    from .auth_manager import AuthManager
+    if not os.path.isdir(faces_dir):
+        return []
+    orphans = []
+    for folder in sorted(os.listdir(faces_dir)):
+        user_id = AuthManager._user_id_from_folder(folder)
+        if user_id is not None and user_id not in known_ids and os.path.isdir(os.path.join(faces_dir, folder)):
+            orphans.append(os.path.join(faces_dir, folder))
+    return orphans
+
+
+def model_footprint():
+    """(bytes on disk of the global model plus shards, mean predict seconds on stored faces)"""
+    from .auth_manager import AuthManager
+    from .recognizer import create_recognizer
+    paths = [AuthManager.trainer_path()]
+    if os.path.isdir(MODELS_DIR):
+        paths += [os.path.join(MODELS_DIR, f) for f in os.listdir(MODELS_DIR)]
+    size = sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+
+    predict_s = None
+    if os.path.exists(AuthManager.trainer_path()):
+        faces, _ = get_sample_store().load()
+        if len(faces):
+            probe = faces[np.linspace(0, len(faces) - 1, min(20, len(faces))).astype(int)]
+            recognizer = create_recognizer()
+            recognizer.read(AuthManager.trainer_path())
+            start = time.perf_counter()
+            for face in probe:
+                recognizer.predict(face)
+            predict_s = (time.perf_counter() - start) / len(probe)
+    return size, predict_s
+
+
+def curate_dataset(known_ids, cap=SAMPLE_CAP_PER_USER, max_distance=DEDUP_HAMMING_DISTANCE, dry_run=False, retrain=True):
+    """Drop orphans and near-duplicates, cap each user, compact and retrain; returns a report dict"""
+    from .auth_manager import AuthManager
+    store = get_sample_store()
+    report = {"samples_before": len(store), "orphan_users": [], "orphan_samples": 0, "orphan_folders": [],
+              "duplicates": 0, "capped": 0, "bytes_reclaimed": 0}
+    size, predict_s = model_footprint()
+    report["model_bytes_before"] = size
+    report["predict_ms_before"] = round(predict_s * 1000, 3) if predict_s is not None else None
+
+    known = set(known_ids)
+    for user_id in store.user_ids():
+        if user_id not in known:
+            report["orphan_users"].append(user_id)
+            report["orphan_samples"] += len(store.positions(user_id))
+            if not dry_run:
+                # Same path as deleting a user: shard and samples go, the next rebuild drops the histograms
+                AuthManager.forget_user(user_id)
+    for folder in orphan_folders(known):
+        report["orphan_folders"].append(folder)
+        if not dry_run:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    for user_id in store.user_ids():
+        if user_id not in known:
+            continue
+        positions = store.positions(user_id)
+        faces, _ = store.load(user_id)
+        sharpness = store.index["sharpness"][positions].astype(np.float64)
+        hashes = dhash(faces)
+
+        dupes = near_duplicates(hashes, sharpness, max_distance)
+        keep = np.setdiff1d(np.arange(len(positions)), dupes)
+        chosen = keep[diverse_subset(hashes[keep], sharpness[keep], cap)]
+        capped = np.setdiff1d(keep, chosen)
+
+        report["duplicates"] += len(dupes)
+        report["capped"] += len(capped)
+        if not dry_run:
+            store.deactivate(positions[np.concatenate([dupes, capped])])
+
+    report["samples_after"] = (report["samples_before"] - report["orphan_samples"]
+                               - report["duplicates"] - report["capped"])
+    if dry_run:
+        return report
+
+    report["bytes_reclaimed"] = store.compact()
+    if retrain:
+        AuthManager.train_recognizer()
+        get_model_cache().invalidate()
+        size, predict_s = model_footprint()
+        report["model_bytes_after"] = size
+        report["predict_ms_after"] = round(predict_s * 1000, 3) if predict_s is not None else None
+    return report
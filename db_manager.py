@@ -1,71 +1,344 @@
 import sqlite3
 import json
 import logging
-from .config import DB_PATH
+import queue
+import threading
+import time
+import uuid
+from .config import DB_PATH, DB_FLUSH_INTERVAL, DB_BATCH_SIZE, EVENT_RETENTION_DAYS, EVENT_PRUNE_CHUNK
+
+# Security event types written to the journal; each lock reason is its own type so reports can use the indexes
+EVENT_LOCK_INTRUDER = "lock_intruder"
+EVENT_LOCK_ABSENCE = "lock_absence"
+EVENT_LOCK_GHOST_INPUT = "lock_ghost_input"
+EVENT_INTRUDER = "intruder_seen"
+EVENT_GHOST_INPUT = "ghost_input"
+EVENT_UNLOCK_ATTEMPT = "unlock_attempt"
+EVENT_UNLOCK = "unlock"
+
+# Adds closed, not yet rolled-up sessions to session_daily; {filter} narrows it (e.g. to one session)
+SESSION_ROLLUP_SQL = '''
+    INSERT INTO session_daily (day, workstation, user_id, sessions, seconds, absences)
+    SELECT date(start_time, 'localtime'), COALESCE(workstation, 0), COALESCE(user_id, 0), COUNT(*),
+           SUM(MAX(0, (julianday(end_time) - julianday(start_time)) * 86400)), SUM(COALESCE(absence_events, 0))
+    FROM sessions
+    WHERE end_time IS NOT NULL AND rolled_up = 0 {filter}
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, workstation, user_id) DO UPDATE SET
+        sessions = sessions + excluded.sessions,
+        seconds = seconds + excluded.seconds,
+        absences = absences + excluded.absences
+'''
 
 class DBManager:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        self.cursor = self.conn.cursor()
+    def __init__(self, db_path=DB_PATH, workstation=None):
+        self.db_path = db_path
+        self.workstation = workstation if workstation is not None else uuid.getnode()
+        # One connection per thread instead of a shared cursor
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.create_tables()
 
+        # Write-behind queue for writes nobody waits on
+        self._write_queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="DBWriter", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL only fsyncs at checkpoints; commits no longer block on disk
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
     def create_tables(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                employee_id TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                face_encoding TEXT NOT NULL,
-                mac_address INTEGER NOT NULL
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                end_time TIMESTAMP,
-                absence_events INTEGER DEFAULT 0,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
-        self.conn.commit()
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    employee_id TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    face_encoding TEXT NOT NULL,
+                    mac_address INTEGER NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    end_time TIMESTAMP,
+                    absence_events INTEGER DEFAULT 0,
+                    FOREIGN KEY(user_id) REFERENCES users(id)
+                )
+            ''')
+            # Append-only journal; 'value' carries a number where one applies (e.g. seconds locked)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS security_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    session_id INTEGER,
+                    user_id INTEGER,
+                    workstation INTEGER,
+                    event_type TEXT NOT NULL,
+                    detail TEXT,
+                    value REAL
+                )
+            ''')
+            self._migrate_sessions()
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_start ON sessions (user_id, start_time)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_ws_start ON sessions (workstation, start_time)')
+            # Per-day session totals, maintained as each session closes (see update_session_stats)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS session_daily (
+                    day TEXT NOT NULL,
+                    workstation INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    sessions INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    absences INTEGER NOT NULL,
+                    PRIMARY KEY (day, workstation, user_id)
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_session_daily_user ON session_daily (user_id, day)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_session_daily_ws ON session_daily (workstation, day)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_events_ts ON security_events (ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_events_type_ts ON security_events (event_type, ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_events_ws_type_ts ON security_events (workstation, event_type, ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_events_user_type_ts ON security_events (user_id, event_type, ts, value)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_events_session_ts ON security_events (session_id, ts)')
+            # Compacted history: per-day counts survive after raw events age out
+            # (0 stands for "no workstation/user": NULLs would never match the primary key on upsert)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS security_event_daily (
+                    day TEXT NOT NULL,
+                    workstation INTEGER,
+                    user_id INTEGER,
+                    event_type TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    value_sum REAL,
+                    PRIMARY KEY (day, workstation, user_id, event_type)
+                )
+            ''')
+
+    def _migrate_sessions(self):
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(sessions)')}
+        if "workstation" not in columns:
+            self.conn.execute('ALTER TABLE sessions ADD COLUMN workstation INTEGER')
+        if "rolled_up" not in columns:
+            # Existing closed sessions are folded into session_daily by 'maintenance.py rebuild-rollups'
+            self.conn.execute('ALTER TABLE sessions ADD COLUMN rolled_up INTEGER NOT NULL DEFAULT 0')
+
+    # --- Write-behind ---
+
+    def enqueue_write(self, sql, params=()):
+        """Queue a non-critical write; it is committed in a batch within DB_FLUSH_INTERVAL"""
+        self._write_queue.put((sql, params))
+
+    def flush(self, timeout=None):
+        """Block until every write queued so far is committed"""
+        done = threading.Event()
+        self._write_queue.put(done)
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                break
+            batch, waiters = [], []
+            deadline = time.monotonic() + DB_FLUSH_INTERVAL
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    # Flush request: commit what we have right now
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= DB_BATCH_SIZE:
+                    break
+                try:
+                    item = self._write_queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._commit_batch(conn, batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                break
+
+    def _commit_batch(self, conn, batch):
+        if not batch:
+            return
+        try:
+            with conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logging.error(f"Write-behind batch of {len(batch)} failed: {e}")
+
+    # --- Users (synchronous: callers need the result) ---
 
     def add_user(self, name, employee_id, password_hash, face_encoding, mac_address):
         try:
             encoding_json = json.dumps(face_encoding)
-            self.cursor.execute('''
-                INSERT INTO users (name, employee_id, password_hash, face_encoding, mac_address)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, employee_id, password_hash, encoding_json, mac_address))
-            self.conn.commit()
-            return self.cursor.lastrowid
+            with self.conn:
+                cursor = self.conn.execute('''
+                    INSERT INTO users (name, employee_id, password_hash, face_encoding, mac_address)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, employee_id, password_hash, encoding_json, mac_address))
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
             return None
 
     def delete_user(self, user_id):
-        self.cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-        self.conn.commit()
+        with self.conn:
+            self.conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+
+    def user_ids(self):
+        return [row[0] for row in self.conn.execute('SELECT id FROM users')]
 
     def get_user_by_id(self, employee_id):
-        self.cursor.execute('SELECT * FROM users WHERE employee_id = ?', (employee_id,))
-        return self.cursor.fetchone()
+        return self.conn.execute('SELECT * FROM users WHERE employee_id = ?', (employee_id,)).fetchone()
+
+    # --- Sessions ---
 
     def log_session_start(self, user_id):
-        self.cursor.execute('INSERT INTO sessions (user_id) VALUES (?)', (user_id,))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self.conn:
+            cursor = self.conn.execute('INSERT INTO sessions (user_id, workstation) VALUES (?, ?)',
+                                       (user_id, self.workstation))
+        return cursor.lastrowid
 
     def update_session_stats(self, session_id, absences):
-        import datetime
-        end_time = datetime.datetime.now()
-        self.cursor.execute('''
-            UPDATE sessions 
+        # UTC text, the same format as the start_time default (CURRENT_TIMESTAMP)
+        end_time = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        self.enqueue_write('''
+            UPDATE sessions
             SET end_time = ?, absence_events = ?
             WHERE id = ?
         ''', (end_time, absences, session_id))
-        self.conn.commit()
+        # Same batch, same order: the closed session is folded into its day exactly once
+        self.enqueue_write(SESSION_ROLLUP_SQL.format(filter='AND id = ?'), (session_id,))
+        self.enqueue_write('UPDATE sessions SET rolled_up = 1 WHERE id = ? AND end_time IS NOT NULL', (session_id,))
+
+    # --- Security event journal ---
+
+    def log_event(self, event_type, session_id=None, user_id=None, detail=None, value=None, ts=None):
+        """Append an event; batched through the write-behind queue so callers never wait on disk"""
+        self.enqueue_write('''
+            INSERT INTO security_events (ts, session_id, user_id, workstation, event_type, detail, value)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (ts if ts is not None else time.time(), session_id, user_id, self.workstation, event_type, detail, value))
+
+    def query_events(self, event_type=None, since=None, until=None, workstation=None, user_id=None, session_id=None, limit=1000):
+        """Newest-first events matching every given filter (each combination hits an index)"""
+        clauses, params = [], []
+        for column, val in (("event_type", event_type), ("workstation", workstation),
+                            ("user_id", user_id), ("session_id", session_id)):
+            if val is not None:
+                clauses.append(f"{column} = ?")
+                params.append(val)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        return self.conn.execute(f'''
+            SELECT id, ts, session_id, user_id, workstation, event_type, detail, value
+            FROM security_events {where}
+            ORDER BY ts DESC LIMIT ?
+        ''', params).fetchall()
+
+    def count_events(self, event_type, since=None, until=None, workstation=None):
+        clauses, params = ["event_type = ?"], [event_type]
+        if workstation is not None:
+            clauses.append("workstation = ?")
+            params.append(workstation)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM security_events WHERE {' AND '.join(clauses)}", params).fetchone()[0]
+
+    def mean_unlock_time_by_user(self, since=None):
+        """[(user_id, unlocks, mean seconds locked)] from unlock events"""
+        params = [EVENT_UNLOCK]
+        where = "event_type = ?"
+        if since is not None:
+            where += " AND ts >= ?"
+            params.append(since)
+        return self.conn.execute(f'''
+            SELECT user_id, COUNT(*), AVG(value) FROM security_events
+            WHERE {where} AND value IS NOT NULL
+            GROUP BY user_id
+        ''', params).fetchall()
+
+    def prune_events(self, retention_days=EVENT_RETENTION_DAYS):
+        """Retention: fold raw events older than the cutoff into daily counts, then delete them"""
+        cutoff = time.time() - retention_days * 86400
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO security_event_daily (day, workstation, user_id, event_type, events, value_sum)
+                SELECT date(ts, 'unixepoch', 'localtime'), COALESCE(workstation, 0), COALESCE(user_id, 0), event_type,
+                       COUNT(*), SUM(value)
+                FROM security_events WHERE ts < ?
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (day, workstation, user_id, event_type) DO UPDATE SET
+                    events = events + excluded.events,
+                    value_sum = COALESCE(value_sum, 0) + COALESCE(excluded.value_sum, 0)
+            ''', (cutoff,))
+        removed = 0
+        while True:
+            # Small transactions so the sentinel's writes are never blocked for long
+            with self.conn:
+                cursor = self.conn.execute('''
+                    DELETE FROM security_events WHERE id IN (
+                        SELECT id FROM security_events WHERE ts < ? LIMIT ?)
+                ''', (cutoff, EVENT_PRUNE_CHUNK))
+            removed += cursor.rowcount
+            if cursor.rowcount < EVENT_PRUNE_CHUNK:
+                break
+        return removed
+
+    def compact(self):
+        """Reclaim space after pruning (blocks writers; run from maintenance, not the app)"""
+        self.flush()
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.conn.execute('VACUUM')
+        self.conn.execute('PRAGMA optimize')
 
     def close(self):
-        self.conn.close()
+        self.flush()
+        self._write_queue.put(None)
+        self._writer.join(timeout=5)
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # Connection belongs to another thread; it goes away with that thread
+                    pass
+            self._connections = []
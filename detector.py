@@ -0,0 +1,78 @@
+import math
+import threading
+import cv2
+from .config import CASCADE_PATH, DETECTION_WIDTH, FACE_DISTANCE_RANGE, CAMERA_HFOV_DEG, FACE_WIDTH_M
+
+# Smallest window the Haar cascade can evaluate
+CASCADE_MIN_SIDE = 24
+
+
+def expected_face_sizes(frame_width, distance_range=FACE_DISTANCE_RANGE, hfov_deg=CAMERA_HFOV_DEG, face_width=FACE_WIDTH_M):
+    """(min, max) face side in pixels for a frame this wide, from the expected user distance"""
+    near, far = distance_range
+    visible_width = lambda d: 2 * d * math.tan(math.radians(hfov_deg) / 2)
+    smallest = frame_width * face_width / visible_width(far)
+    largest = frame_width * face_width / visible_width(near)
+    # Cascade boxes are looser than the face itself; leave some slack both ways
+    return int(smallest * 0.8), int(largest * 1.5)
+
+
+class FaceDetector:
+    """Haar cascade that searches a downscaled copy and returns full-resolution boxes"""
+
+    def __init__(self, scale_factor=1.2, min_neighbors=5, detection_width=DETECTION_WIDTH, cascade=None):
+        self.cascade = cascade or cv2.CascadeClassifier(CASCADE_PATH)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.detection_width = detection_width
+        self._size_cache = {}
+
+    def detect(self, gray, min_size=None, max_size=None):
+        """Detect faces in a grayscale image; explicit sizes are in full-resolution pixels"""
+        height, width = gray.shape[:2]
+        if min_size is None and max_size is None:
+            if width not in self._size_cache:
+                lo, hi = expected_face_sizes(width)
+                self._size_cache[width] = ((lo, lo), (hi, hi))
+            min_size, max_size = self._size_cache[width]
+
+        scale = 1.0
+        small = gray
+        if self.detection_width and width > self.detection_width:
+            scale = self.detection_width / width
+            small = cv2.resize(gray, (self.detection_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+
+        kwargs = {}
+        if min_size:
+            side = max(CASCADE_MIN_SIDE, int(min(min_size) * scale))
+            kwargs["minSize"] = (side, side)
+        if max_size:
+            side = max(CASCADE_MIN_SIDE, int(max(max_size) * scale))
+            kwargs["maxSize"] = (side, side)
+
+        boxes = self.cascade.detectMultiScale(small, self.scale_factor, self.min_neighbors, **kwargs)
+        if scale == 1.0:
+            return [tuple(int(v) for v in b) for b in boxes]
+
+        inv = 1.0 / scale
+        mapped = []
+        for (x, y, w, h) in boxes:
+            x0, y0 = int(x * inv), int(y * inv)
+            x1, y1 = min(width, int(math.ceil((x + w) * inv))), min(height, int(math.ceil((y + h) * inv)))
+            mapped.append((x0, y0, x1 - x0, y1 - y0))
+        return mapped
+
+
+class PerThreadDetector:
+    """FaceDetector facade for worker pools: CascadeClassifier is not safe to share between
+    concurrent callers, so each worker thread lazily gets its own"""
+
+    def __init__(self, scale_factor=1.2, min_neighbors=5, detection_width=DETECTION_WIDTH):
+        self.kwargs = {"scale_factor": scale_factor, "min_neighbors": min_neighbors, "detection_width": detection_width}
+        self._local = threading.local()
+
+    def detect(self, gray, min_size=None, max_size=None):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = FaceDetector(**self.kwargs)
+        return detector.detect(gray, min_size, max_size)
@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from .config import (ENROLL_TARGET_SAMPLES, ENROLL_MIN_POSES, ENROLL_MAX_FRAMES, ENROLL_MIN_SHARPNESS,
+                     ENROLL_BRIGHTNESS_RANGE, ENROLL_DUPLICATE_DIFF, ENROLL_MAX_OFFCENTER, SAMPLE_SIZE)
+from .detector import FaceDetector
+from .sample_store import normalize_crop
+
+# Reasons a frame does not yield a sample (also the keys of EnrollmentWorker.rejected)
+REJECT_NO_FACE = "no_face"
+REJECT_MULTIPLE = "multiple_faces"
+REJECT_POSE = "pose"
+REJECT_BLUR = "blur"
+REJECT_EXPOSURE = "exposure"
+REJECT_DUPLICATE = "duplicate"
+
+THUMB_SIZE = 16
+PREVIEW_WIDTH = 320
+
+
+class EnrollmentWorker(threading.Thread):
+    """Streams camera frames through detect -> crop -> quality gates on a worker thread
+
+    Only accepted grayscale crops are kept (plus one frame for the signup audit image), so
+    memory is bounded by the sample target. Progress goes out on 'updates' as small dicts the
+    Tk thread polls with after(); the last message has type 'done'.
+    """
+
+    def __init__(self, user_id, source=None, detector=None, target=ENROLL_TARGET_SAMPLES,
+                 min_poses=ENROLL_MIN_POSES, max_frames=ENROLL_MAX_FRAMES, train=True):
+        super().__init__(name="Enrollment", daemon=True)
+        if source is None:
+            from .camera_service import SharedCameraSource
+            source = SharedCameraSource()
+        self.user_id = user_id
+        self.source = source
+        self.detector = detector or FaceDetector(scale_factor=1.3, min_neighbors=5)
+        self.target = target
+        self.min_poses = min_poses
+        self.max_frames = max_frames
+        self.train = train
+        # Preview/progress messages are droppable; only 'done' is guaranteed delivery
+        self.updates = queue.Queue(maxsize=4)
+        self.crops = []
+        self.poses = set()
+        self.rejected = dict.fromkeys((REJECT_NO_FACE, REJECT_MULTIPLE, REJECT_POSE, REJECT_BLUR,
+                                       REJECT_EXPOSURE, REJECT_DUPLICATE), 0)
+        self.frames_seen = 0
+        self.audit_frame = None
+        self._thumbs = []
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def complete(self):
+        return len(self.crops) >= self.target and len(self.poses) >= self.min_poses
+
+    def run(self):
+        started = time.monotonic()
+        # 'saved' is set once samples may be on disk, so a rollback knows whether it has anything to forget
+        result = {"type": "done", "ok": False, "error": None, "saved": False}
+        try:
+            self.source.open()
+            while not self._cancelled and not self.complete and self.frames_seen < self.max_frames:
+                ret, frame = self.source.read()
+                if not ret:
+                    if not self.source.live:
+                        break
+                    continue
+                self.frames_seen += 1
+                reason = self.consider(frame)
+                self._post({"type": "progress", "accepted": len(self.crops), "target": self.target,
+                            "poses": len(self.poses), "frames": self.frames_seen, "rejected": reason,
+                            "preview": self._preview(frame)})
+            self.source.release()
+
+            result["capture_seconds"] = time.monotonic() - started
+            if self._cancelled:
+                result["error"] = "cancelled"
+            elif len(self.crops) == 0:
+                result["error"] = "no usable face samples"
+            else:
+                result["saved"] = True
+                result["ok"] = self.save()
+                if not result["ok"]:
+                    result["error"] = "training failed"
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            self.source.release()
+        result.update({"samples": len(self.crops), "poses": len(self.poses), "frames": self.frames_seen,
+                       "rejected": dict(self.rejected), "seconds": time.monotonic() - started})
+        self.updates.put(result)
+
+    def consider(self, frame):
+        """Run one frame through the gates; returns the reject reason or None if a sample was kept"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = self.detector.detect(gray)
+        if len(faces) == 0:
+            return self._reject(REJECT_NO_FACE)
+        if len(faces) > 1:
+            return self._reject(REJECT_MULTIPLE)
+
+        x, y, w, h = faces[0]
+        pose = self._pose_bucket(gray.shape, faces[0])
+        if pose is None:
+            return self._reject(REJECT_POSE)
+
+        crop = gray[y:y+h, x:x+w]
+        normalized = normalize_crop(crop, SAMPLE_SIZE)
+        if cv2.Laplacian(normalized, cv2.CV_64F).var() < ENROLL_MIN_SHARPNESS:
+            return self._reject(REJECT_BLUR)
+        lo, hi = ENROLL_BRIGHTNESS_RANGE
+        if not lo <= normalized.mean() <= hi:
+            return self._reject(REJECT_EXPOSURE)
+
+        thumb = cv2.resize(normalized, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+        if any(np.abs(thumb - t).mean() < ENROLL_DUPLICATE_DIFF for t in self._thumbs):
+            return self._reject(REJECT_DUPLICATE)
+
+        self._thumbs.append(thumb)
+        self.crops.append(crop.copy())
+        self.poses.add(pose)
+        if self.audit_frame is None:
+            self.audit_frame = frame
+        return None
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        return reason
+
+    def _pose_bucket(self, shape, box):
+        """(horizontal, vertical, size) bucket for a usable box; None if too far off-center or out of range"""
+        height, width = shape[:2]
+        x, y, w, h = box
+        dx = (x + w / 2) / width - 0.5
+        dy = (y + h / 2) / height - 0.5
+        if abs(dx) > ENROLL_MAX_OFFCENTER or abs(dy) > ENROLL_MAX_OFFCENTER:
+            return None
+        # Cascade boxes are near-square; a stretched one is usually a partial or tilted face
+        if not 0.8 <= w / h <= 1.25:
+            return None
+        size_bin = int(w / width > 0.3)
+        third = ENROLL_MAX_OFFCENTER / 3
+        return (int(np.sign(dx)) if abs(dx) > third else 0,
+                int(np.sign(dy)) if abs(dy) > third else 0,
+                size_bin)
+
+    def _preview(self, frame):
+        h, w = frame.shape[:2]
+        if w <= PREVIEW_WIDTH:
+            return frame
+        return cv2.resize(frame, (PREVIEW_WIDTH, int(h * PREVIEW_WIDTH / w)), interpolation=cv2.INTER_AREA)
+
+    def _post(self, message):
+        try:
+            self.updates.put_nowait(message)
+        except queue.Full:
+            pass
+
+    def save(self):
+        from .auth_manager import AuthManager
+        from .sample_store import get_sample_store
+        get_sample_store().append(self.user_id, self.crops)
+        if not self.train:
+            return True
+        return AuthManager.update_recognizer(self.user_id)
@@ -0,0 +1,111 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+from .config import BREACH_DIR, MAX_BUFFER_SIZE, EVIDENCE_POST_FRAMES, EVIDENCE_FRAME_WIDTH, EVIDENCE_JPEG_QUALITY
+
+
+class EvidenceRecorder:
+    """Keeps a ring of recent downscaled frames and writes breach clips off the analysis thread
+
+    add_frame() is cheap (one resize). capture() snapshots the ring and returns the paths
+    immediately; encoding and disk I/O happen on the writer thread once the post-trigger
+    frames have arrived.
+    """
+
+    def __init__(self, size=MAX_BUFFER_SIZE, post_frames=EVIDENCE_POST_FRAMES, width=EVIDENCE_FRAME_WIDTH,
+                 out_dir=BREACH_DIR):
+        self.ring = deque(maxlen=size)
+        self.post_frames = post_frames
+        self.width = width
+        self.out_dir = out_dir
+        self._pending = []
+        self._jobs = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="EvidenceWriter", daemon=True)
+        self._writer.start()
+
+    def _shrink(self, frame):
+        h, w = frame.shape[:2]
+        if w <= self.width:
+            return frame
+        return cv2.resize(frame, (self.width, int(h * self.width / w)), interpolation=cv2.INTER_AREA)
+
+    def add_frame(self, frame, ts=None):
+        # ts is wall-clock (time.time()), the same clock capture() stamps the lock with
+        entry = (ts if ts is not None else time.time(), self._shrink(frame))
+        self.ring.append(entry)
+        if self._pending:
+            still_waiting = []
+            for job in self._pending:
+                job["post"].append(entry)
+                if len(job["post"]) >= self.post_frames:
+                    self._jobs.put(job)
+                else:
+                    still_waiting.append(job)
+            self._pending = still_waiting
+
+    def capture(self, reason, trigger_frame, metadata=None):
+        """Schedule evidence for a lock; returns the path of the full-res trigger image"""
+        ts = time.time()
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(ts)) + f"_{int(ts * 1000) % 1000:03d}"
+        clip_dir = os.path.join(self.out_dir, f"breach_{stamp}")
+        job = {
+            "reason": reason,
+            "ts": ts,
+            "dir": clip_dir,
+            "trigger": trigger_frame,
+            "pre": list(self.ring),
+            "post": [],
+            "metadata": metadata or {},
+        }
+        if self.post_frames > 0:
+            self._pending.append(job)
+        else:
+            self._jobs.put(job)
+        return os.path.join(clip_dir, "trigger.jpg")
+
+    def flush(self):
+        """Write any captures still waiting for post-trigger frames with what they have"""
+        pending, self._pending = self._pending, []
+        for job in pending:
+            self._jobs.put(job)
+
+    def close(self, timeout=5):
+        self.flush()
+        self._jobs.put(None)
+        self._writer.join(timeout)
+
+    def _write_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                self._write(job)
+            except Exception as e:
+                print(f"Evidence Write Error: {e}")
+
+    def _write(self, job):
+        os.makedirs(job["dir"], exist_ok=True)
+        params = [cv2.IMWRITE_JPEG_QUALITY, EVIDENCE_JPEG_QUALITY]
+        cv2.imwrite(os.path.join(job["dir"], "trigger.jpg"), job["trigger"], params)
+
+        frames = []
+        for i, (ts, frame) in enumerate(job["pre"] + job["post"]):
+            name = f"frame_{i:03d}.jpg"
+            cv2.imwrite(os.path.join(job["dir"], name), frame, params)
+            frames.append({"file": name, "ts": ts, "offset_s": round(ts - job["ts"], 3)})
+
+        meta = dict(job["metadata"])
+        meta.update({
+            "reason": job["reason"],
+            "lock_time": job["ts"],
+            "pre_frames": len(job["pre"]),
+            "post_frames": len(job["post"]),
+            "frames": frames,
+        })
+        with open(os.path.join(job["dir"], "metadata.json"), "w") as f:
+            json.dump(meta, f, indent=2)
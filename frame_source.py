@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from .config import CAMERA_INDEX
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    """Common interface for anything the Sentinel can read frames from"""
+    # Frames to discard after open() while exposure settles
+    warmup_frames = 0
+    # Live sources never run out; finite sources end the capture loop when exhausted
+    live = False
+
+    def open(self):
+        return True
+
+    def read(self):
+        """Return (ok, frame) like cv2.VideoCapture.read()"""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    warmup_frames = 30
+    live = True
+
+    def __init__(self, index=CAMERA_INDEX, api=cv2.CAP_DSHOW):
+        self.index = index
+        self.api = api
+        self.capture = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.index, self.api)
+        return self.capture.isOpened()
+
+    def read(self):
+        if self.capture is None:
+            return False, None
+        return self.capture.read()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class _PacedSource(FrameSource):
+    """Replays finite footage at a fixed rate so it behaves like a camera"""
+
+    def __init__(self, fps=30.0, loop=False, realtime=True):
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self._next_due = None
+
+    def _pace(self):
+        if not self.realtime or not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_due is None:
+            self._next_due = now
+        delay = self._next_due - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_due = max(self._next_due, now) + 1.0 / self.fps
+
+
+class VideoFileSource(_PacedSource):
+    def __init__(self, path, fps=None, loop=False, realtime=True):
+        super().__init__(fps or 0, loop, realtime)
+        self.path = path
+        self.capture = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.fps:
+            self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return self.capture.isOpened()
+
+    def read(self):
+        if self.capture is None:
+            return False, None
+        self._pace()
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return ret, frame
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class ImageDirectorySource(_PacedSource):
+    def __init__(self, directory, fps=10.0, loop=False, realtime=True):
+        super().__init__(fps, loop, realtime)
+        self.directory = directory
+        self.paths = []
+        self.position = 0
+
+    def open(self):
+        if not os.path.isdir(self.directory):
+            return False
+        self.paths = sorted(
+            os.path.join(self.directory, f) for f in os.listdir(self.directory)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.position = 0
+        return len(self.paths) > 0
+
+    def read(self):
+        if self.position >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self.position = 0
+        self._pace()
+        frame = cv2.imread(self.paths[self.position])
+        self.position += 1
+        return frame is not None, frame
+
+
+class SyntheticSource(_PacedSource):
+    """Generates frames from a callable (index -> BGR frame) or a flat grey scene"""
+
+    def __init__(self, frame_fn=None, count=None, size=(640, 480), fps=30.0, realtime=True):
+        super().__init__(fps, False, realtime)
+        self.frame_fn = frame_fn
+        self.count = count
+        self.size = size
+        self.position = 0
+
+    def read(self):
+        if self.count is not None and self.position >= self.count:
+            return False, None
+        self._pace()
+        if self.frame_fn is not None:
+            frame = self.frame_fn(self.position)
+        else:
+            w, h = self.size
+            frame = np.full((h, w, 3), 96, dtype=np.uint8)
+        self.position += 1
+        return frame is not None, frame
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox: a new frame overwrites any frame not yet consumed"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._fresh = False
+        self.closed = False
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._fresh:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._fresh = True
+            self.frames_captured += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for a frame newer than the last one returned; None on timeout or close"""
+        with self._cond:
+            if not self._fresh and not self.closed:
+                self._cond.wait(timeout)
+            if not self._fresh:
+                return None
+            self._fresh = False
+            return self._frame
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class FrameGrabber(threading.Thread):
+    """Capture stage: reads the source as fast as it delivers into a LatestFrameSlot"""
+
+    def __init__(self, source, slot=None, timings=None):
+        super().__init__(daemon=True)
+        self.source = source
+        self.slot = slot or LatestFrameSlot()
+        self.timings = timings
+        self.running = False
+
+    def run(self):
+        self.running = True
+        try:
+            if not self.source.open():
+                print("Warning: Frame source failed to open.")
+            while self.running:
+                started = self.timings.now() if self.timings else 0
+                ret, frame = self.source.read()
+                if self.timings: self.timings.record("capture", started)
+                if not ret:
+                    if not self.source.live:
+                        break
+                    print("Warning: Camera read failed. Retrying...")
+                    time.sleep(1)
+                    continue
+                self.slot.put(frame)
+        finally:
+            self.source.release()
+            self.slot.close()
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from .config import INPUT_WINDOW, INPUT_DISARM_AFTER, INPUT_REARM_AFTER
+
+INPUT_KINDS = ("move", "click", "scroll", "key")
+
+
+class InputActivityTracker:
+    """Coalesces keyboard/mouse events into counters the Sentinel samples once per iteration
+
+    Listener callbacks only bump an integer. The high-rate mouse hook is dropped while the
+    user is verified and re-armed once verification lapses, which is when ghost input matters.
+    """
+
+    def __init__(self, hooks=True, window=INPUT_WINDOW, clock=time.monotonic):
+        self.hooks = hooks
+        self.window = window
+        self.clock = clock
+        self.counts = dict.fromkeys(INPUT_KINDS, 0)
+        self._sampled_total = 0
+        self.history = deque()  # (sample time, events since previous sample)
+        self.last_input_time = clock()
+        self.mouse_armed = False
+        self._mouse = None
+        self._keyboard = None
+        self._verified_since = None
+        self._unverified_since = None
+        # Per-session readers sharing these hooks (see view())
+        self._views = []
+        self._views_lock = threading.Lock()
+
+    # --- Listener callbacks (pynput threads) ---
+
+    def _on_move(self, *args):
+        self.counts["move"] += 1
+
+    def _on_click(self, *args):
+        self.counts["click"] += 1
+
+    def _on_scroll(self, *args):
+        self.counts["scroll"] += 1
+
+    def _on_key(self, *args):
+        self.counts["key"] += 1
+
+    def record(self, kind="key", count=1):
+        """Inject events by hand (headless replays, tests)"""
+        self.counts[kind] += count
+
+    def total(self):
+        return sum(self.counts.values())
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if not self.hooks:
+            return
+        from pynput import keyboard
+        self._keyboard = keyboard.Listener(on_press=self._on_key)
+        self._keyboard.start()
+        self.arm_mouse()
+
+    def stop(self):
+        self.disarm_mouse()
+        if self._keyboard:
+            self._keyboard.stop()
+            self._keyboard = None
+
+    def arm_mouse(self):
+        self.mouse_armed = True
+        if self.hooks and self._mouse is None:
+            from pynput import mouse
+            # pynput listeners cannot be restarted, so each arm creates a fresh one
+            self._mouse = mouse.Listener(on_move=self._on_move, on_click=self._on_click, on_scroll=self._on_scroll)
+            self._mouse.start()
+
+    def disarm_mouse(self):
+        self.mouse_armed = False
+        if self._mouse is not None:
+            self._mouse.stop()
+            self._mouse = None
+
+    def update_arming(self, verified, now):
+        """Drop mouse hooks once the user is stably verified; re-arm when the absence window opens"""
+        if verified:
+            self._unverified_since = None
+            if self._verified_since is None:
+                self._verified_since = now
+            if self.mouse_armed and (now - self._verified_since) >= INPUT_DISARM_AFTER:
+                self.disarm_mouse()
+        else:
+            self._verified_since = None
+            if self._unverified_since is None:
+                self._unverified_since = now
+            if not self.mouse_armed and (now - self._unverified_since) >= INPUT_REARM_AFTER:
+                self.arm_mouse()
+
+    # --- Sampling (Sentinel thread) ---
+
+    def sample(self, now):
+        """Fold events since the last call into the history; returns how many arrived"""
+        total = self.total()
+        new_events = total - self._sampled_total
+        self._sampled_total = total
+        if new_events:
+            self.last_input_time = now
+            self.history.append((now, new_events))
+        while self.history and self.history[0][0] < now - self.window:
+            self.history.popleft()
+        return new_events
+
+    # --- Sharing one set of hooks between sessions ---
+
+    def view(self):
+        """Independent reader for one Sentinel; hooks run while any attached view needs them"""
+        return InputActivityView(self)
+
+    def attach(self, view):
+        with self._views_lock:
+            first = not self._views
+            self._views.append(view)
+            if first:
+                self.start()
+        self.refresh_mouse()
+
+    def detach(self, view):
+        with self._views_lock:
+            if view in self._views:
+                self._views.remove(view)
+            if not self._views:
+                self.stop()
+                return
+        self.refresh_mouse()
+
+    def refresh_mouse(self):
+        """Mouse hook stays armed while at least one attached session wants it"""
+        with self._views_lock:
+            wanted = any(v.mouse_armed for v in self._views)
+            if wanted and not self.mouse_armed:
+                self.arm_mouse()
+            elif not wanted and self.mouse_armed:
+                self.disarm_mouse()
+
+    def events_in(self, now, seconds):
+        return sum(n for ts, n in self.history if ts >= now - seconds)
+
+    def rate(self, now, seconds=1.0):
+        """Input events per second over the last 'seconds'"""
+        return self.events_in(now, seconds) / seconds if seconds else 0.0
+
+
+class InputActivityView(InputActivityTracker):
+    """One session's window onto a shared tracker: own history and arming state, shared counters"""
+
+    def __init__(self, shared):
+        super().__init__(hooks=False, window=shared.window, clock=shared.clock)
+        self.shared = shared
+        self.counts = shared.counts
+        self._sampled_total = shared.total()
+
+    def start(self):
+        self.mouse_armed = True
+        self.shared.attach(self)
+
+    def stop(self):
+        self.mouse_armed = False
+        self.shared.detach(self)
+
+    def arm_mouse(self):
+        self.mouse_armed = True
+        self.shared.refresh_mouse()
+
+    def disarm_mouse(self):
+        self.mouse_armed = False
+        self.shared.refresh_mouse()
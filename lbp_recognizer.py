@@ -0,0 +1,177 @@
+import math
+import cv2
+import numpy as np
+from .config import SAMPLE_SIZE, MODEL_MMAP
+from .model_format import is_binary_model, read_model, write_model
+
+# Cap on the two (faces x gallery x bins) buffers of one chi-square block; kept small so they stay in cache
+CHI_SQUARE_BLOCK_BYTES = 1024 * 1024
+# Added to every chi-square denominator instead of masking out empty bins
+CHI_SQUARE_EPS = np.float32(np.finfo(np.float32).tiny)
+
+
+def lbp_codes(images, radius=1, neighbors=8):
+    """Circular LBP codes for a stack of grayscale images (B, H, W), as OpenCV's LBPH computes them"""
+    src = images.astype(np.float32)
+    h, w = src.shape[1:]
+    center = src[:, radius:h - radius, radius:w - radius]
+    codes = np.zeros(center.shape, dtype=np.int32)
+
+    one = np.float32(1)
+    for n in range(neighbors):
+        # Sample point and weights in float32, as OpenCV computes them, so near-ties break the same way
+        x = np.float32(radius * math.cos(2.0 * math.pi * n / neighbors))
+        y = np.float32(-radius * math.sin(2.0 * math.pi * n / neighbors))
+        fx, fy = int(math.floor(x)), int(math.floor(y))
+        cx, cy = int(math.ceil(x)), int(math.ceil(y))
+        tx, ty = x - np.float32(fx), y - np.float32(fy)
+        w1, w2, w3, w4 = (one - tx) * (one - ty), tx * (one - ty), (one - tx) * ty, tx * ty
+
+        def shifted(dy, dx):
+            return src[:, radius + dy:h - radius + dy, radius + dx:w - radius + dx]
+
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        codes |= ((t > center) | (np.abs(t - center) < np.finfo(np.float32).eps)).astype(np.int32) << n
+    return codes
+
+
+def spatial_histograms(codes, bins, grid_x=8, grid_y=8):
+    """Per-cell L1-normalized code histograms, concatenated row-major: (B, grid_x * grid_y * bins)"""
+    count, h, w = codes.shape
+    cell_h, cell_w = h // grid_y, w // grid_x
+    cells = grid_x * grid_y
+    grid = codes[:, :cell_h * grid_y, :cell_w * grid_x]
+    grid = grid.reshape(count, grid_y, cell_h, grid_x, cell_w).transpose(0, 1, 3, 2, 4).reshape(count, cells, -1)
+
+    offsets = (np.arange(count * cells, dtype=np.int64) * bins).reshape(count, cells, 1)
+    hist = np.bincount((grid + offsets).ravel(), minlength=count * cells * bins)
+    return (hist.reshape(count, cells * bins) / float(cell_h * cell_w)).astype(np.float32)
+
+
+def chi_square(queries, gallery):
+    """Chi-square (alt) distance between every query row and every gallery row: (Q, N)"""
+    out = np.empty((len(queries), len(gallery)), dtype=np.float32)
+    if len(gallery) == 0:
+        return out
+    per_row = max(1, len(queries) * queries.shape[1] * 4 * 2)
+    step = min(len(gallery), max(1, CHI_SQUARE_BLOCK_BYTES // per_row))
+    q = queries[:, None, :]
+    # Two block buffers reused for every block; all arithmetic happens in place
+    total_buf = np.empty((len(queries), step, queries.shape[1]), dtype=np.float32)
+    diff_buf = np.empty_like(total_buf)
+    for start in range(0, len(gallery), step):
+        block = gallery[None, start:start + step, :]
+        total = total_buf[:, :block.shape[1]]
+        diff = diff_buf[:, :block.shape[1]]
+        np.add(q, block, out=total)
+        np.subtract(q, block, out=diff)
+        np.multiply(diff, diff, out=diff)
+        # Histograms are non-negative, so an empty bin pair is 0 / tiny = 0; other bins are unchanged
+        np.add(total, CHI_SQUARE_EPS, out=total)
+        np.divide(diff, total, out=diff)
+        np.sum(diff, axis=2, out=out[:, start:start + step])
+    out *= 2.0
+    return out
+
+
+class NumpyLBPHRecognizer:
+    """LBPH recognizer with all enrolled histograms in one contiguous matrix"""
+
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8, size=SAMPLE_SIZE):
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.size = size
+        self.histograms = np.zeros((0, self.dims), dtype=np.float32)
+        self.labels = np.zeros(0, dtype=np.int32)
+
+    @property
+    def dims(self):
+        return self.grid_x * self.grid_y * (2 ** self.neighbors)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def compute_histograms(self, images):
+        """Histograms for a batch of face crops of any size"""
+        stack = np.empty((len(images), self.size, self.size), dtype=np.uint8)
+        for i, img in enumerate(images):
+            if img.ndim == 3:
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if img.shape != (self.size, self.size):
+                img = cv2.resize(img, (self.size, self.size), interpolation=cv2.INTER_AREA)
+            stack[i] = img
+        codes = lbp_codes(stack, self.radius, self.neighbors)
+        return spatial_histograms(codes, 2 ** self.neighbors, self.grid_x, self.grid_y)
+
+    def train(self, images, labels):
+        self.histograms = np.zeros((0, self.dims), dtype=np.float32)
+        self.labels = np.zeros(0, dtype=np.int32)
+        self.update(images, labels)
+
+    def update(self, images, labels):
+        if len(images) == 0:
+            return
+        self.histograms = np.ascontiguousarray(np.vstack([self.histograms, self.compute_histograms(images)]))
+        self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=np.int32).ravel()])
+
+    def remove_labels(self, labels):
+        """Drop every histogram with one of these labels; returns how many were removed"""
+        keep = ~np.isin(self.labels, list(labels))
+        removed = int(len(self.labels) - keep.sum())
+        if removed:
+            self.histograms = np.ascontiguousarray(self.histograms[keep])
+            self.labels = self.labels[keep]
+        return removed
+
+    def predict_batch(self, images, k=1):
+        """k best (label, distance) pairs per face, one distinct label per entry"""
+        if len(images) == 0 or len(self.labels) == 0:
+            return [[] for _ in images]
+        distances = chi_square(self.compute_histograms(images), self.histograms)
+        results = []
+        for row in distances:
+            matches = []
+            seen = set()
+            for idx in np.argsort(row, kind="stable"):
+                label = int(self.labels[idx])
+                if label not in seen:
+                    seen.add(label)
+                    matches.append((label, float(row[idx])))
+                    if len(matches) == k:
+                        break
+            results.append(matches)
+        return results
+
+    def predict(self, image):
+        matches = self.predict_batch([image], k=1)[0]
+        return matches[0] if matches else (-1, float("inf"))
+
+    def release_mapping(self):
+        """Copy memory-mapped arrays into memory so the model file is no longer held open"""
+        if isinstance(self.histograms, np.memmap):
+            self.histograms = np.array(self.histograms)
+        if isinstance(self.labels, np.memmap):
+            self.labels = np.array(self.labels)
+
+    def save(self, path):
+        # Windows cannot replace a mapped file: unmap every loaded copy of it first
+        from .model_cache import get_model_cache
+        get_model_cache().release(path)
+        self.release_mapping()
+        write_model(path, self.histograms, self.labels, self.radius, self.neighbors, self.grid_x, self.grid_y, self.size)
+
+    def read(self, path, mmap=MODEL_MMAP):
+        if not is_binary_model(path):
+            # Models saved before the binary format
+            with np.load(path) as data:
+                self.radius, self.neighbors, self.grid_x, self.grid_y, self.size = (int(v) for v in data["params"])
+                self.histograms = np.ascontiguousarray(data["histograms"], dtype=np.float32)
+                self.labels = data["labels"].astype(np.int32)
+            return
+        # Mapped, not parsed: load time no longer grows with the number of enrolled faces
+        params, self.histograms, self.labels = read_model(path, mmap)
+        self.radius, self.neighbors = params["radius"], params["neighbors"]
+        self.grid_x, self.grid_y = params["grid_x"], params["grid_y"]
+        self.size = params["size"] or SAMPLE_SIZE
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import argparse
+
+# Add src to path to import config
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+try:
+    from src.auth_manager import AuthManager
+    from src.sample_store import get_sample_store
+    from src.db_manager import DBManager, EVENT_LOCK_INTRUDER, EVENT_LOCK_ABSENCE, EVENT_LOCK_GHOST_INPUT
+    from src.reporting import SessionReports, day_string
+    from src.dataset_tools import curate_dataset
+    from src.model_format import convert_yaml, convert_npz, read_model
+    from src.config import TRAINER_PATH, MODELS_DIR, SAMPLE_SIZE, SAMPLE_CAP_PER_USER, DEDUP_HAMMING_DISTANCE
+except ImportError:
+    # Fallback if running from root
+    from MedGuard_Core.src.auth_manager import AuthManager
+    from MedGuard_Core.src.sample_store import get_sample_store
+    from MedGuard_Core.src.db_manager import DBManager, EVENT_LOCK_INTRUDER, EVENT_LOCK_ABSENCE, EVENT_LOCK_GHOST_INPUT
+    from MedGuard_Core.src.reporting import SessionReports, day_string
+    from MedGuard_Core.src.dataset_tools import curate_dataset
+    from MedGuard_Core.src.model_format import convert_yaml, convert_npz, read_model
+    from MedGuard_Core.src.config import TRAINER_PATH, MODELS_DIR, SAMPLE_SIZE, SAMPLE_CAP_PER_USER, DEDUP_HAMMING_DISTANCE
+
+def rebuild_model(args):
+    print("Rebuilding recognizer from the full face dataset...")
+    start = time.time()
+    if AuthManager.train_recognizer():
+        print(f"SUCCESS: Model rebuilt in {time.time() - start:.1f}s")
+    else:
+        print("No face samples found; model not written.")
+
+def remove_user(args):
+    removed, samples = AuthManager.forget_user(args.user_id)
+    print(f"{'Deleted' if removed else 'No'} model shard for user {args.user_id}.")
+    print(f"Removed {samples} stored samples for user {args.user_id}.")
+    print("Run 'rebuild-model' to drop them from the global model as well.")
+
+def migrate_samples(args):
+    store = get_sample_store()
+    migrated = store.migrate_from_folders()
+    print(f"Migrated {migrated} samples into {store.data_path} ({len(store)} total).")
+
+def convert_models(args):
+    sources = [os.path.splitext(TRAINER_PATH)[0] + ext for ext in (".yml", ".npz")]
+    if os.path.isdir(MODELS_DIR):
+        sources += [os.path.join(MODELS_DIR, f) for f in sorted(os.listdir(MODELS_DIR)) if f.endswith((".yml", ".npz"))]
+    converted = 0
+    for src_path in sources:
+        if not os.path.exists(src_path):
+            continue
+        out_path = os.path.splitext(src_path)[0] + ".lbph"
+        start = time.perf_counter()
+        if src_path.endswith(".yml"):
+            count = convert_yaml(src_path, out_path, size=SAMPLE_SIZE)
+        else:
+            count = convert_npz(src_path, out_path)
+        took = time.perf_counter() - start
+        start = time.perf_counter()
+        read_model(out_path)
+        load = time.perf_counter() - start
+        print(f"{os.path.basename(src_path)} -> {os.path.basename(out_path)}: {count} histograms, "
+              f"{os.path.getsize(src_path) / 1e6:.1f}MB -> {os.path.getsize(out_path) / 1e6:.1f}MB, "
+              f"converted in {took:.2f}s, loads in {load * 1000:.1f}ms")
+        if args.remove:
+            os.remove(src_path)
+        converted += 1
+    print(f"Converted {converted} model(s). Set RECOGNIZER_BACKEND = \"numpy\" to use them.")
+
+def curate(args):
+    db = DBManager()
+    known = db.user_ids()
+    db.close()
+    start = time.time()
+    report = curate_dataset(known, cap=args.cap, max_distance=args.distance, dry_run=args.dry_run,
+                            retrain=not args.no_retrain)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {report['orphan_samples']} samples of {len(report['orphan_users'])} deleted users "
+          f"and {len(report['orphan_folders'])} orphaned folders.")
+    print(f"{verb} {report['duplicates']} near-duplicates and {report['capped']} samples over the cap of {args.cap}.")
+    print(f"Samples: {report['samples_before']} -> {report['samples_after']}")
+    if report["bytes_reclaimed"]:
+        print(f"Reclaimed {report['bytes_reclaimed'] / 1e6:.1f}MB from the sample store.")
+    if "model_bytes_after" in report:
+        print(f"Model size: {report['model_bytes_before'] / 1e6:.1f}MB -> {report['model_bytes_after'] / 1e6:.1f}MB")
+        if report["predict_ms_before"] is not None and report["predict_ms_after"] is not None:
+            print(f"Predict time: {report['predict_ms_before']:.2f}ms -> {report['predict_ms_after']:.2f}ms per face")
+    print(f"Done in {time.time() - start:.1f}s")
+
+def prune_events(args):
+    db = DBManager()
+    removed = db.prune_events(args.days) if args.days is not None else db.prune_events()
+    print(f"Folded and deleted {removed} journal events past retention.")
+    if args.compact:
+        db.compact()
+        print("Database compacted.")
+    db.close()
+
+def event_report(args):
+    db = DBManager()
+    since = time.time() - args.days * 86400
+    locks = [(label, db.count_events(event_type, since=since, workstation=db.workstation))
+             for label, event_type in (("Intruder", EVENT_LOCK_INTRUDER), ("Absence", EVENT_LOCK_ABSENCE),
+                                       ("Ghost input", EVENT_LOCK_GHOST_INPUT))]
+    print(f"Locks on this workstation in the last {args.days} days: {sum(count for _, count in locks)}")
+    for label, count in locks:
+        print(f"  {label}: {count}")
+    for user_id, unlocks, mean_s in db.mean_unlock_time_by_user(since):
+        print(f"  User {user_id}: {unlocks} unlocks, mean {mean_s:.1f}s locked")
+    db.close()
+
+def session_report(args):
+    db = DBManager()
+    reports = SessionReports(db)
+    since = day_string(days_ago=args.days)
+    start = time.perf_counter()
+    if args.by == "user":
+        rows = reports.by_user(since_day=since)
+    elif args.by == "workstation":
+        rows = reports.by_workstation(since_day=since)
+    else:
+        rows = reports.by_day(since_day=since, user_id=args.user_id)
+    took = time.perf_counter() - start
+    print(f"Sessions by {args.by} since {since}:")
+    for row in rows:
+        avg = f"{row['avg_session_minutes']:.1f}" if row["avg_session_minutes"] is not None else "-"
+        print(f"  {row['key']}: {row['sessions']} sessions, {row['hours']:.1f}h, "
+              f"{row['absences']} absences, avg {avg} min")
+    print(f"({took * 1000:.1f}ms)")
+    db.close()
+
+def rebuild_rollups(args):
+    db = DBManager()
+    rolled = SessionReports(db).rebuild()
+    print(f"Rebuilt daily session rollups from {rolled} closed sessions.")
+    db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="MedGuard maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild-model", help="Retrain the recognizer from every saved sample")
+    p.set_defaults(func=rebuild_model)
+
+    p = sub.add_parser("remove-user", help="Delete one user's shard and stored samples")
+    p.add_argument("user_id", type=int)
+    p.set_defaults(func=remove_user)
+
+    p = sub.add_parser("migrate-samples", help="Import legacy dataset/User_* folders into the packed sample store")
+    p.set_defaults(func=migrate_samples)
+
+    p = sub.add_parser("curate-dataset", help="Drop orphaned and near-duplicate samples, cap each user, compact and retrain")
+    p.add_argument("--cap", type=int, default=SAMPLE_CAP_PER_USER, help="Samples kept per user")
+    p.add_argument("--distance", type=int, default=DEDUP_HAMMING_DISTANCE, help="dHash bits for near-duplicates")
+    p.add_argument("--dry-run", action="store_true", help="Report what would change without touching anything")
+    p.add_argument("--no-retrain", action="store_true")
+    p.set_defaults(func=curate)
+
+    p = sub.add_parser("convert-models", help="Convert trainer.yml and per-user shards to the binary .lbph format")
+    p.add_argument("--remove", action="store_true", help="Delete the source files after converting")
+    p.set_defaults(func=convert_models)
+
+    p = sub.add_parser("prune-events", help="Apply the security journal retention policy")
+    p.add_argument("--days", type=int, help="Override EVENT_RETENTION_DAYS")
+    p.add_argument("--compact", action="store_true", help="Checkpoint and VACUUM afterwards")
+    p.set_defaults(func=prune_events)
+
+    p = sub.add_parser("event-report", help="Summarize recent locks and unlock times")
+    p.add_argument("--days", type=int, default=7)
+    p.set_defaults(func=event_report)
+
+    p = sub.add_parser("session-report", help="Usage, absences and average session length from the daily rollups")
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--by", choices=["day", "user", "workstation"], default="user")
+    p.add_argument("--user-id", type=int, help="Limit --by day to one user")
+    p.set_defaults(func=session_report)
+
+    p = sub.add_parser("rebuild-rollups", help="Recompute daily session rollups from the sessions table")
+    p.set_defaults(func=rebuild_rollups)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from .config import CASCADE_PATH, MODEL_CACHE_SIZE
+
+
+class ModelCache:
+    """Process-wide cache of the Haar cascade and per-user recognizers
+
+    Loads run on a background thread so the UI can start them during the password
+    step; loaded recognizers stay warm across logout/login until the model file changes.
+    """
+
+    def __init__(self, max_users=MODEL_CACHE_SIZE):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ModelLoader")
+        self._cascade = None
+        self._cascade_future = None
+        # user_id -> (future, model path, mtime at load)
+        self._recognizers = OrderedDict()
+        self.load_times = {}
+
+    # --- Cascade ---
+
+    def preload_cascade(self):
+        with self._lock:
+            if self._cascade_future is None:
+                self._cascade_future = self._pool.submit(self._load_cascade)
+            return self._cascade_future
+
+    def _load_cascade(self):
+        started = time.perf_counter()
+        cascade = cv2.CascadeClassifier(CASCADE_PATH)
+        self.load_times["cascade"] = time.perf_counter() - started
+        return cascade
+
+    def cascade(self):
+        return self.preload_cascade().result()
+
+    # --- Recognizers ---
+
+    def _model_state(self, user_id):
+        from .auth_manager import AuthManager
+        path = AuthManager.recognizer_path(user_id)
+        mtime = os.path.getmtime(path) if path else None
+        return path, mtime
+
+    def preload(self, user_id, cascade=True):
+        """Start loading a user's recognizer (and the cascade, unless the caller brings its own) if not already warm"""
+        if cascade:
+            self.preload_cascade()
+        path, mtime = self._model_state(user_id)
+        with self._lock:
+            entry = self._recognizers.get(user_id)
+            if entry is not None and entry[1] == path and entry[2] == mtime:
+                self._recognizers.move_to_end(user_id)
+                return entry[0]
+            future = self._pool.submit(self._load_recognizer, user_id, path)
+            self._recognizers[user_id] = (future, path, mtime)
+            self._recognizers.move_to_end(user_id)
+            while len(self._recognizers) > self.max_users:
+                self._recognizers.popitem(last=False)
+            return future
+
+    def _load_recognizer(self, user_id, path):
+        if path is None:
+            return None
+        from .recognizer import create_recognizer
+        started = time.perf_counter()
+        recognizer = create_recognizer()
+        recognizer.read(path)
+        self.load_times[user_id] = time.perf_counter() - started
+        return recognizer
+
+    def recognizer(self, user_id, timeout=None):
+        """Warm recognizer for this user (waits for an in-flight load); None if no model exists"""
+        return self.preload(user_id, cascade=False).result(timeout)
+
+    def status(self, user_id=None):
+        """'ready', 'loading' or 'failed' for the cascade plus (optionally) one user's model;
+        'no_model' when that user has no model file, so Sentinel would run detection-only"""
+        futures = [self.preload_cascade()]
+        if user_id is not None:
+            with self._lock:
+                entry = self._recognizers.get(user_id)
+            if entry is None:
+                return "loading"
+            futures.append(entry[0])
+        if any(not f.done() for f in futures):
+            return "loading"
+        if any(f.exception() is not None for f in futures):
+            return "failed"
+        if user_id is not None and futures[-1].result() is None:
+            return "no_model"
+        return "ready"
+
+    def release(self, path):
+        """Forget recognizers loaded from this model file and drop their memory maps before it is rewritten"""
+        path = os.path.abspath(path)
+        with self._lock:
+            stale = [uid for uid, entry in self._recognizers.items() if entry[1] and os.path.abspath(entry[1]) == path]
+            entries = [self._recognizers.pop(uid) for uid in stale]
+        for future, _, _ in entries:
+            try:
+                recognizer = future.result()
+            except Exception:
+                continue
+            # Running sessions hold the same object, so this unmaps their copy too
+            if hasattr(recognizer, "release_mapping"):
+                recognizer.release_mapping()
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._recognizers.clear()
+            else:
+                self._recognizers.pop(user_id, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_model_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ModelCache()
+        return _cache
@@ -0,0 +1,109 @@
+import os
+import struct
+import cv2
+import numpy as np
+
+# Binary LBPH model: fixed header, then float32 histograms (count x dims) and int32 labels,
+# each 64-byte aligned so both can be memory-mapped straight from the file.
+MAGIC = b"MGLBPH\x00\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sI5iQIQQd")
+HEADER_SIZE = 128
+ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def is_binary_model(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_model(path, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8, size=0, threshold=float("inf")):
+    """Write histograms/labels atomically (tmp file + rename)"""
+    histograms = np.ascontiguousarray(histograms, dtype="<f4")
+    labels = np.ascontiguousarray(np.asarray(labels).ravel(), dtype="<i4")
+    count = len(labels)
+    dims = histograms.shape[1] if histograms.ndim == 2 else grid_x * grid_y * (2 ** neighbors)
+    if len(histograms) != count:
+        raise ValueError(f"{len(histograms)} histograms but {count} labels")
+
+    hist_offset = HEADER_SIZE
+    labels_offset = _aligned(hist_offset + histograms.nbytes)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, radius, neighbors, grid_x, grid_y, size,
+                         count, dims, hist_offset, labels_offset, threshold)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\x00"))
+        f.write(histograms.tobytes())
+        f.write(b"\x00" * (labels_offset - hist_offset - histograms.nbytes))
+        f.write(labels.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_model(path, mmap=True):
+    """(params, histograms, labels); arrays are read-only memory maps unless mmap=False"""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a binary LBPH model")
+    (_, version, radius, neighbors, grid_x, grid_y, size,
+     count, dims, hist_offset, labels_offset, threshold) = HEADER.unpack(raw)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"{path} uses model format v{version}; this build reads up to v{FORMAT_VERSION}")
+    expected = labels_offset + count * 4
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"{path} is truncated ({os.path.getsize(path)} of {expected} bytes)")
+
+    params = {"radius": radius, "neighbors": neighbors, "grid_x": grid_x, "grid_y": grid_y,
+              "size": size, "threshold": threshold}
+    if count == 0:
+        return params, np.zeros((0, dims), dtype=np.float32), np.zeros(0, dtype=np.int32)
+    if mmap:
+        histograms = np.memmap(path, dtype="<f4", mode="r", offset=hist_offset, shape=(count, dims))
+        labels = np.memmap(path, dtype="<i4", mode="r", offset=labels_offset, shape=(count,))
+    else:
+        with open(path, "rb") as f:
+            f.seek(hist_offset)
+            histograms = np.fromfile(f, dtype="<f4", count=count * dims).reshape(count, dims)
+            f.seek(labels_offset)
+            labels = np.fromfile(f, dtype="<i4", count=count)
+    return params, histograms, labels
+
+
+def convert_yaml(yml_path, out_path, size=0):
+    """Convert an OpenCV LBPH trainer.yml into the binary format; returns the histogram count"""
+    fs = cv2.FileStorage(yml_path, cv2.FILE_STORAGE_READ)
+    try:
+        root = fs.getNode("opencv_lbphfaces")
+        if root.empty():
+            raise ValueError(f"{yml_path} is not an LBPH model")
+        params = {key: int(root.getNode(key).real()) for key in ("radius", "neighbors", "grid_x", "grid_y")}
+        threshold_node = root.getNode("threshold")
+        threshold = threshold_node.real() if not threshold_node.empty() else float("inf")
+        hist_node = root.getNode("histograms")
+        count = hist_node.size()
+        dims = params["grid_x"] * params["grid_y"] * (2 ** params["neighbors"])
+        histograms = np.empty((count, dims), dtype=np.float32)
+        for i in range(count):
+            histograms[i] = hist_node.at(i).mat().ravel()
+        labels_mat = root.getNode("labels").mat()
+        labels = labels_mat.ravel().astype(np.int32) if labels_mat is not None else np.zeros(0, dtype=np.int32)
+    finally:
+        fs.release()
+    write_model(out_path, histograms, labels, size=size, threshold=threshold, **params)
+    return count
+
+
+def convert_npz(npz_path, out_path):
+    """Convert a model saved by the earlier npz NumPy backend"""
+    with np.load(npz_path) as data:
+        radius, neighbors, grid_x, grid_y, size = (int(v) for v in data["params"])
+        write_model(out_path, data["histograms"], data["labels"], radius, neighbors, grid_x, grid_y, size)
+        return len(data["labels"])
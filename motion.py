@@ -0,0 +1,54 @@
+import numpy as np
+from .config import MOTION_WIDTH, MOTION_PIXEL_DELTA, MOTION_CHANGED_FRACTION, MOTION_MAX_SKIP_SECONDS
+
+
+def block_thumbnail(gray, width=MOTION_WIDTH):
+    """Block-averaged thumbnail (plain NumPy, no interpolation), as int16 for differencing"""
+    height, full_width = gray.shape[:2]
+    step = max(1, full_width // width)
+    h, w = (height // step) * step, (full_width // step) * step
+    blocks = gray[:h, :w].reshape(h // step, step, w // step, step)
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(np.int16)
+
+
+class MotionGate:
+    """Says whether a frame differs enough from the last analyzed one to be worth analyzing
+
+    The reference is the last frame that was analyzed, not the previous frame, so slow
+    drift still adds up to a re-check. A full check is forced every max_interval seconds.
+    """
+
+    def __init__(self, width=MOTION_WIDTH, pixel_delta=MOTION_PIXEL_DELTA, changed_fraction=MOTION_CHANGED_FRACTION,
+                 max_interval=MOTION_MAX_SKIP_SECONDS):
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.changed_fraction = changed_fraction
+        self.max_interval = max_interval
+        self.reference = None
+        self.reference_time = None
+        self.last_change = 0.0
+        self.analyzed = 0
+        self.skipped = 0
+
+    def should_analyze(self, gray, now, force=False):
+        thumb = block_thumbnail(gray, self.width)
+        if (force or self.reference is None or self.reference.shape != thumb.shape
+                or now - self.reference_time >= self.max_interval):
+            return self._accept(thumb, now)
+
+        changed = np.count_nonzero(np.abs(thumb - self.reference) > self.pixel_delta)
+        self.last_change = changed / float(thumb.size)
+        if self.last_change >= self.changed_fraction:
+            return self._accept(thumb, now)
+        self.skipped += 1
+        return False
+
+    def _accept(self, thumb, now):
+        self.reference = thumb
+        self.reference_time = now
+        self.analyzed += 1
+        return True
+
+    def reset(self):
+        self.reference = None
+        self.reference_time = None
@@ -0,0 +1,100 @@
+import threading
+import time
+import cv2
+from .config import PREVIEW_FPS, PREVIEW_SIZE
+
+
+class PreviewPipeline:
+    """Hands camera frames to a Tk label without letting the UI or the sentinel fall behind
+
+    start() gives the preview its own CameraService subscription, so it runs at PREVIEW_FPS
+    whatever rate the sentinel analyzes at. submit() runs on that feeder thread: it
+    rate-limits, shrinks the frame and converts only the small copy. At most one frame
+    waits for Tk; newer frames replace it.
+    """
+
+    def __init__(self, root, label, size=PREVIEW_SIZE, max_fps=PREVIEW_FPS):
+        self.root = root
+        self.label = label
+        self.size = size
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self._lock = threading.Lock()
+        self._pending = None
+        self._scheduled = False
+        self._last_submit = 0.0
+        self._paused = set()
+        self.service = None
+        self._slot = None
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+    def start(self, service=None):
+        """Subscribe to the shared camera and feed submit() from a background thread"""
+        if service is None:
+            from .camera_service import get_camera_service
+            service = get_camera_service()
+        self.service = service
+        self._slot = service.subscribe()
+        threading.Thread(target=self._feed, args=(self._slot,), name="PreviewFeed", daemon=True).start()
+
+    def stop(self):
+        slot, self._slot = self._slot, None
+        if slot is not None:
+            self.service.unsubscribe(slot)
+
+    def _feed(self, slot):
+        while not slot.closed:
+            frame = slot.get(1.0)
+            if frame is not None:
+                self.submit(frame)
+
+    def pause(self, reason):
+        with self._lock:
+            self._paused.add(reason)
+            self._pending = None
+
+    def resume(self, reason):
+        with self._lock:
+            self._paused.discard(reason)
+
+    @property
+    def paused(self):
+        return bool(self._paused)
+
+    def submit(self, frame):
+        now = time.monotonic()
+        if self._paused or (now - self._last_submit) < self.min_interval:
+            self.frames_skipped += 1
+            return
+        self._last_submit = now
+
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+        with self._lock:
+            if self._pending is not None:
+                self.frames_skipped += 1
+            self._pending = rgb
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.root.after(0, self._drain)
+        except RuntimeError:
+            # Tk is shutting down
+            pass
+
+    def _drain(self):
+        # Tk thread: build the PhotoImage from whatever is newest right now
+        with self._lock:
+            rgb = self._pending
+            self._pending = None
+            self._scheduled = False
+        if rgb is None or not self.label.winfo_exists():
+            return
+
+        from PIL import Image, ImageTk
+        imgtk = ImageTk.PhotoImage(image=Image.fromarray(rgb))
+        self.label.imgtk = imgtk  # Keep ref
+        self.label.configure(image=imgtk)
+        self.frames_shown += 1
@@ -0,0 +1,52 @@
+import time
+from .config import RECOGNITION_MAX_FACES, RECOGNITION_BUDGET_MS
+
+
+class RecognitionBudget:
+    """Decides which tracked faces get a recognizer call this frame
+
+    Faces with a cached identity are free. The rest are ranked (waiting longest first, then
+    size, closeness to the frame centre and track age) and predicted until the face or time
+    budget runs out; the remainder are returned as skipped so callers can treat them as
+    pending rather than as safe or as intruders.
+    """
+
+    def __init__(self, max_faces=RECOGNITION_MAX_FACES, budget_ms=RECOGNITION_BUDGET_MS, clock=time.perf_counter):
+        self.max_faces = max_faces
+        self.budget = budget_ms / 1000.0 if budget_ms else None
+        self.clock = clock
+        self.predicted = 0
+        self.skipped = 0
+
+    def priority(self, track, frame_shape):
+        height, width = frame_shape[:2]
+        x, y, w, h = track.box
+        size = (w * h) / float(width * height)
+        dx = (x + w / 2) / width - 0.5
+        dy = (y + h / 2) / height - 0.5
+        centrality = 1.0 - min(1.0, (dx * dx + dy * dy) ** 0.5 / 0.7071)
+        age = min(track.age, 30) / 30.0
+        # Starved faces jump the queue so nobody stays unrecognized for long
+        return (track.skipped, size + 0.5 * centrality + 0.25 * age)
+
+    def run(self, tracks, frame_shape, predict_fn):
+        """predict_fn(track) for as many uncached faces as the budget allows; returns the skipped tracks"""
+        pending = [t for t in tracks if t.identity is None]
+        if not pending:
+            return []
+        pending.sort(key=lambda t: self.priority(t, frame_shape), reverse=True)
+
+        started = self.clock()
+        skipped = []
+        done = 0
+        for track in pending:
+            over_time = self.budget is not None and done > 0 and self.clock() - started >= self.budget
+            if (self.max_faces and done >= self.max_faces) or over_time:
+                track.skipped += 1
+                skipped.append(track)
+                continue
+            predict_fn(track)
+            done += 1
+        self.predicted += done
+        self.skipped += len(skipped)
+        return skipped
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import cv2
+import numpy as np
+from .config import RECOGNIZER_BACKEND, SAMPLE_SIZE
+from .sample_store import normalize_crop
+
+
+class OpenCVRecognizer:
+    """cv2.face LBPH behind the same interface as NumpyLBPHRecognizer"""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.model = cv2.face.LBPHFaceRecognizer_create()
+        # LBPH does not rescale its input; queries must match the stored training crops
+        self.size = size
+
+    def __len__(self):
+        return len(self.model.getHistograms())
+
+    def train(self, images, labels):
+        self.model.train(list(images), np.asarray(labels, dtype=np.int32))
+
+    def update(self, images, labels):
+        if len(self) == 0:
+            self.train(images, labels)
+        else:
+            self.model.update(list(images), np.asarray(labels, dtype=np.int32))
+
+    def predict(self, image):
+        return self.model.predict(normalize_crop(image, self.size))
+
+    def predict_batch(self, images, k=1):
+        images = [normalize_crop(img, self.size) for img in images]
+        if k == 1:
+            return [[tuple(self.model.predict(img))] for img in images]
+        results = []
+        for img in images:
+            # The collector sees every stored sample; keep the best per label
+            collector = cv2.face.StandardCollector_create()
+            self.model.predict_collect(img, collector)
+            matches = []
+            seen = set()
+            for label, dist in collector.getResults(True):
+                if label not in seen:
+                    seen.add(label)
+                    matches.append((int(label), float(dist)))
+                    if len(matches) == k:
+                        break
+            results.append(matches)
+        return results
+
+    def remove_labels(self, labels):
+        histograms = self.model.getHistograms()
+        current = self.model.getLabels().flatten()
+        drop = set(labels)
+        keep = [i for i, label in enumerate(current) if label not in drop]
+        removed = len(current) - len(keep)
+        if removed == 0:
+            return 0
+        fresh = cv2.face.LBPHFaceRecognizer_create(
+            self.model.getRadius(), self.model.getNeighbors(), self.model.getGridX(), self.model.getGridY())
+        if keep:
+            # LBPH has no API to delete samples, so round-trip its YAML layout without them
+            fd, tmp_path = tempfile.mkstemp(suffix=".yml")
+            os.close(fd)
+            try:
+                self._write_yaml(tmp_path, [histograms[i] for i in keep],
+                                 np.array([current[i] for i in keep], dtype=np.int32))
+                fresh.read(tmp_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.model = fresh
+        return removed
+
+    def _write_yaml(self, path, histograms, labels):
+        fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE)
+        fs.startWriteStruct("opencv_lbphfaces", cv2.FileNode_MAP)
+        fs.write("threshold", self.model.getThreshold())
+        fs.write("radius", self.model.getRadius())
+        fs.write("neighbors", self.model.getNeighbors())
+        fs.write("grid_x", self.model.getGridX())
+        fs.write("grid_y", self.model.getGridY())
+        fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+        for hist in histograms:
+            fs.write("", hist)
+        fs.endWriteStruct()
+        fs.write("labels", labels.reshape(-1, 1))
+        fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+        fs.endWriteStruct()
+        fs.endWriteStruct()
+        fs.release()
+
+    def save(self, path):
+        self.model.save(path)
+
+    def read(self, path):
+        self.model.read(path)
+
+
+MODEL_EXTENSIONS = {"opencv": ".yml", "numpy": ".lbph"}
+
+
+def create_recognizer(backend=None):
+    backend = backend or RECOGNIZER_BACKEND
+    if backend == "numpy":
+        from .lbp_recognizer import NumpyLBPHRecognizer
+        return NumpyLBPHRecognizer()
+    if backend == "opencv":
+        return OpenCVRecognizer()
+    raise ValueError(f"Unknown recognizer backend: {backend}")
+
+
+def model_file(path, backend=None):
+    """Model path with the extension the backend writes (trainer.yml -> trainer.lbph etc.)"""
+    return os.path.splitext(path)[0] + MODEL_EXTENSIONS[backend or RECOGNIZER_BACKEND]
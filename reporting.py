@@ -0,0 +1,80 @@
+import time
+from .db_manager import SESSION_ROLLUP_SQL
+
+
+def day_string(ts=None, days_ago=0):
+    """Local 'YYYY-MM-DD' for a Unix time (default: now), optionally shifted back"""
+    ts = time.time() if ts is None else ts
+    return time.strftime("%Y-%m-%d", time.localtime(ts - days_ago * 86400))
+
+
+class SessionReports:
+    """Usage reporting over the session_daily rollup (never scans raw sessions)
+
+    Day bounds are inclusive 'YYYY-MM-DD' strings. Seconds only count closed sessions.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _where(self, since_day, until_day, user_id, workstation):
+        clauses, params = [], []
+        for column, val in (("user_id", user_id), ("workstation", workstation)):
+            if val is not None:
+                clauses.append(f"{column} = ?")
+                params.append(val)
+        if since_day is not None:
+            clauses.append("day >= ?")
+            params.append(since_day)
+        if until_day is not None:
+            clauses.append("day <= ?")
+            params.append(until_day)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _grouped(self, key, since_day, until_day, user_id, workstation):
+        where, params = self._where(since_day, until_day, user_id, workstation)
+        rows = self.db.conn.execute(f'''
+            SELECT {key}, SUM(sessions), SUM(seconds), SUM(absences)
+            FROM session_daily {where}
+            GROUP BY {key} ORDER BY {key}
+        ''', params).fetchall()
+        return [{
+            "key": row[0],
+            "sessions": row[1],
+            "hours": round(row[2] / 3600.0, 2),
+            "absences": row[3],
+            "avg_session_minutes": round(row[2] / row[1] / 60.0, 1) if row[1] else None,
+        } for row in rows]
+
+    def by_day(self, since_day=None, until_day=None, user_id=None, workstation=None):
+        return self._grouped("day", since_day, until_day, user_id, workstation)
+
+    def by_user(self, since_day=None, until_day=None, workstation=None):
+        return self._grouped("user_id", since_day, until_day, None, workstation)
+
+    def by_workstation(self, since_day=None, until_day=None, user_id=None):
+        return self._grouped("workstation", since_day, until_day, user_id, None)
+
+    def user_sessions(self, user_id, since=None, limit=100):
+        """Newest raw sessions for one user (idx_sessions_user_start); since is 'YYYY-MM-DD HH:MM:SS' UTC"""
+        params = [user_id]
+        where = "user_id = ?"
+        if since is not None:
+            where += " AND start_time >= ?"
+            params.append(since)
+        params.append(limit)
+        return self.db.conn.execute(f'''
+            SELECT id, start_time, end_time, workstation, absence_events
+            FROM sessions WHERE {where}
+            ORDER BY start_time DESC LIMIT ?
+        ''', params).fetchall()
+
+    def rebuild(self):
+        """Recompute session_daily from every closed session (after migrating an old database)"""
+        self.db.flush()
+        with self.db.conn:
+            self.db.conn.execute('DELETE FROM session_daily')
+            self.db.conn.execute('UPDATE sessions SET rolled_up = 0')
+            self.db.conn.execute(SESSION_ROLLUP_SQL.format(filter=''))
+            cursor = self.db.conn.execute('UPDATE sessions SET rolled_up = 1 WHERE end_time IS NOT NULL')
+        return cursor.rowcount
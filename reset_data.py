@@ -6,10 +6,10 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 try:
-    from src.config import DB_PATH, FACES_DIR, TRAINER_PATH, LOGS_DIR, BASE_DIR
+    from src.config import DB_PATH, FACES_DIR, TRAINER_PATH, MODELS_DIR, LOGS_DIR, BASE_DIR
 except ImportError:
     # Fallback if running from root
-    from MedGuard_Core.src.config import DB_PATH, FACES_DIR, TRAINER_PATH, LOGS_DIR, BASE_DIR
+    from MedGuard_Core.src.config import DB_PATH, FACES_DIR, TRAINER_PATH, MODELS_DIR, LOGS_DIR, BASE_DIR
 
 def reset_system():
     print("WARNING: This will DELETE ALL USERS, FACES, LOGS, and DATABASE ENTRIES.")
@@ -47,11 +47,22 @@ def reset_system():
         except Exception as e:
              print(f"  - Error: {e}")
 
-    print("\n[4/4] Removing Trained Model...")
-    if os.path.exists(TRAINER_PATH):
+    print("\n[4/4] Removing Trained Models...")
+    # Global model in every backend format (trainer.yml / trainer.lbph / legacy trainer.npz)
+    base = os.path.splitext(TRAINER_PATH)[0]
+    for path in (base + ".yml", base + ".lbph", base + ".npz"):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+                print(f"  - Deleted {path}")
+            except Exception as e:
+                print(f"  - Error: {e}")
+    # Per-user shards
+    if os.path.exists(MODELS_DIR):
         try:
-            os.remove(TRAINER_PATH)
-            print(f"  - Deleted {TRAINER_PATH}")
+            shutil.rmtree(MODELS_DIR)
+            os.makedirs(MODELS_DIR)
+            print(f"  - Wiped {MODELS_DIR}")
         except Exception as e:
             print(f"  - Error: {e}")
 
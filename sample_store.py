@@ -0,0 +1,184 @@
+import os
+import threading
+import cv2
+import numpy as np
+from .config import SAMPLE_STORE_PATH, SAMPLE_INDEX_PATH, SAMPLE_SIZE, FACES_DIR
+
+INDEX_DTYPE = np.dtype([
+    ("user_id", "<i4"),
+    ("sample_id", "<i4"),
+    ("sharpness", "<f4"),   # Variance of the Laplacian of the normalized crop
+    ("brightness", "<f4"),  # Mean grey level
+    ("source_w", "<i4"),    # Crop size before normalization
+    ("source_h", "<i4"),
+    ("active", "u1"),       # 0 once removed; space is reclaimed by compact()
+])
+
+
+def normalize_crop(crop, size=SAMPLE_SIZE):
+    """Grayscale, fixed-size uint8 crop as stored in the sample file"""
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+
+
+class SampleStore:
+    """Packed face samples: one flat array file of SIZE x SIZE crops plus a record index"""
+
+    def __init__(self, data_path=SAMPLE_STORE_PATH, index_path=SAMPLE_INDEX_PATH, size=SAMPLE_SIZE):
+        self.data_path = data_path
+        self.index_path = index_path
+        self.size = size
+        self.record_bytes = size * size
+        self._lock = threading.Lock()
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            index = np.load(self.index_path)
+            # Ignore records whose pixel data never made it to disk
+            stored = os.path.getsize(self.data_path) // self.record_bytes if os.path.exists(self.data_path) else 0
+            return index[:stored]
+        return np.zeros(0, dtype=INDEX_DTYPE)
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp.npy"
+        np.save(tmp_path, self.index)
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self):
+        return int(self.index["active"].sum())
+
+    def user_ids(self):
+        return sorted(set(int(u) for u in self.index["user_id"][self.index["active"] == 1]))
+
+    def append(self, user_id, crops):
+        """Normalize and append crops for a user; returns how many were stored"""
+        if len(crops) == 0:
+            return 0
+        with self._lock:
+            mine = self.index["user_id"] == user_id
+            next_id = int(self.index["sample_id"][mine].max()) + 1 if mine.any() else 0
+
+            records = np.zeros(len(crops), dtype=INDEX_DTYPE)
+            pixels = np.empty((len(crops), self.size, self.size), dtype=np.uint8)
+            for i, crop in enumerate(crops):
+                pixels[i] = normalize_crop(crop, self.size)
+                records[i] = (user_id, next_id + i, cv2.Laplacian(pixels[i], cv2.CV_64F).var(),
+                              pixels[i].mean(), crop.shape[1], crop.shape[0], 1)
+
+            # Pixel data first, index second: a crash leaves unindexed bytes, never dangling records
+            with open(self.data_path, "r+b" if os.path.exists(self.data_path) else "wb") as f:
+                f.seek(len(self.index) * self.record_bytes)
+                f.write(pixels.tobytes())
+                f.truncate()
+            self.index = np.concatenate([self.index, records])
+            self._save_index()
+            return len(crops)
+
+    def _pixels(self):
+        if len(self.index) == 0:
+            return np.zeros((0, self.size, self.size), dtype=np.uint8)
+        return np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=(len(self.index), self.size, self.size))
+
+    def load(self, user_id=None):
+        """(faces, labels) for active samples; the whole set is one sequential read"""
+        with self._lock:
+            mask = self.index["active"] == 1
+            if user_id is not None:
+                mask &= self.index["user_id"] == user_id
+            faces = np.asarray(self._pixels()[mask])
+            labels = self.index["user_id"][mask].astype(np.int32)
+        return faces, labels
+
+    def read(self, positions):
+        """Pixels of the records at these index positions; only those rows are read from disk"""
+        with self._lock:
+            positions = np.sort(np.asarray(positions, dtype=np.int64))
+            return np.asarray(self._pixels()[positions])
+
+    def records(self, user_id=None):
+        mask = self.index["active"] == 1
+        if user_id is not None:
+            mask &= self.index["user_id"] == user_id
+        return self.index[mask]
+
+    def positions(self, user_id=None):
+        """Index positions of active records (stable until the next compact())"""
+        mask = self.index["active"] == 1
+        if user_id is not None:
+            mask &= self.index["user_id"] == user_id
+        return np.flatnonzero(mask)
+
+    def deactivate(self, positions):
+        """Mark individual records inactive; returns how many changed"""
+        with self._lock:
+            positions = np.asarray(positions, dtype=np.int64)
+            hits = positions[self.index["active"][positions] == 1]
+            self.index["active"][hits] = 0
+            if len(hits):
+                self._save_index()
+            return len(hits)
+
+    def remove_user(self, user_id):
+        """Mark a user's samples inactive; returns how many were removed"""
+        with self._lock:
+            hits = (self.index["user_id"] == user_id) & (self.index["active"] == 1)
+            self.index["active"][hits] = 0
+            if hits.any():
+                self._save_index()
+            return int(hits.sum())
+
+    def compact(self):
+        """Rewrite the data file without inactive records; returns bytes reclaimed"""
+        with self._lock:
+            keep = self.index["active"] == 1
+            if keep.all():
+                return 0
+            before = len(self.index) * self.record_bytes
+            pixels = np.asarray(self._pixels()[keep])
+            tmp_path = self.data_path + ".tmp"
+            pixels.tofile(tmp_path)
+            os.replace(tmp_path, self.data_path)
+            self.index = self.index[keep]
+            self._save_index()
+            return before - len(self.index) * self.record_bytes
+
+    def migrate_from_folders(self, faces_dir=FACES_DIR):
+        """One-time import of the legacy dataset/User_{id}_{name}/N.jpg layout"""
+        from .auth_manager import AuthManager
+        migrated = 0
+        known = set(self.user_ids())
+        for folder in sorted(os.listdir(faces_dir)):
+            user_id = AuthManager._user_id_from_folder(folder)
+            user_dir = os.path.join(faces_dir, folder)
+            if user_id is None or user_id in known or not os.path.isdir(user_dir):
+                continue
+            crops = []
+            for file in sorted(os.listdir(user_dir), key=lambda f: (len(f), f)):
+                if file.endswith(".jpg"):
+                    img = cv2.imread(os.path.join(user_dir, file), cv2.IMREAD_GRAYSCALE)
+                    if img is not None:
+                        crops.append(img)
+            migrated += self.append(user_id, crops)
+        return migrated
+
+    def has_legacy_folders(self, faces_dir=FACES_DIR):
+        if not os.path.isdir(faces_dir):
+            return False
+        return any(
+            f.startswith("User_") and os.path.isdir(os.path.join(faces_dir, f))
+            for f in os.listdir(faces_dir)
+        )
+
+
+_store = None
+
+def get_sample_store():
+    """Process-wide store; the legacy folder layout is migrated the first time it is opened"""
+    global _store
+    if _store is None:
+        _store = SampleStore()
+        if not os.path.exists(SAMPLE_INDEX_PATH) and _store.has_legacy_folders():
+            print(f"[SampleStore] Migrated {_store.migrate_from_folders()} legacy samples.")
+    return _store
@@ -0,0 +1,51 @@
+import time
+from .config import SCHEDULER_RATES, IDLE_STABLE_SECONDS
+
+RATE_IDLE = "idle"
+RATE_FAST = "fast"
+RATE_LOCKED = "locked"
+
+
+class DetectionScheduler:
+    """Picks how long each Sentinel iteration may take based on the security state"""
+
+    def __init__(self, rates=None, stable_after=IDLE_STABLE_SECONDS):
+        self.rates = dict(SCHEDULER_RATES)
+        if rates:
+            self.rates.update(rates)
+        self.stable_after = stable_after
+        self.current = RATE_FAST
+        self.verified_since = None
+        self.rate_counts = {name: 0 for name in self.rates}
+
+    def select(self, locked, verified, now):
+        """Choose the rate for the next iteration and remember it"""
+        if verified:
+            if self.verified_since is None:
+                self.verified_since = now
+        else:
+            self.verified_since = None
+
+        if locked:
+            rate = RATE_LOCKED
+        elif self.verified_since is not None and (now - self.verified_since) >= self.stable_after:
+            rate = RATE_IDLE
+        else:
+            # Unknown face, absence or freshly verified user: react quickly
+            rate = RATE_FAST
+
+        self.current = rate
+        self.rate_counts[rate] = self.rate_counts.get(rate, 0) + 1
+        return rate
+
+    @property
+    def period(self):
+        return self.rates[self.current]
+
+    def wait(self, iteration_started):
+        """Sleep whatever is left of the current rate's budget; returns the time slept"""
+        remaining = self.period - (time.monotonic() - iteration_started)
+        if remaining > 0:
+            time.sleep(remaining)
+            return remaining
+        return 0.0
@@ -3,173 +3,405 @@ import time
 import cv2
 import numpy as np
 from collections import deque
-from pynput import mouse, keyboard
-from .config import MAX_BUFFER_SIZE, GHOST_INPUT_THRESHOLD, CAMERA_INDEX, TRAINER_PATH, CASCADE_PATH, CONFIDENCE_THRESHOLD
+from .config import MAX_BUFFER_SIZE, GHOST_INPUT_THRESHOLD, GHOST_INPUT_MIN_EVENTS, CONFIDENCE_THRESHOLD, TRACKING_ENABLED, STATS_ENABLED, IDENTITY_CACHE_MARGIN, MOTION_GATE_ENABLED, ANALYSIS_MODE
+from .frame_source import FrameGrabber
+from .camera_service import SharedCameraSource
+from .scheduler import DetectionScheduler
+from .tracker import FaceTracker
+from .recognition_budget import RecognitionBudget
+from .motion import MotionGate
+from .detector import FaceDetector
+from .model_cache import get_model_cache
+from .stats import StageStats
+from .evidence import EvidenceRecorder
+from .input_activity import InputActivityTracker
+from .db_manager import EVENT_LOCK_INTRUDER, EVENT_LOCK_ABSENCE, EVENT_LOCK_GHOST_INPUT, EVENT_INTRUDER, EVENT_GHOST_INPUT
 
 class Sentinel(threading.Thread):
-    def __init__(self, user_id, lock_callback, status_callback, frame_callback=None):
+    def __init__(self, user_id, lock_callback, status_callback, frame_callback=None, frame_source=None, input_hooks=True, collect_stats=STATS_ENABLED, event_callback=None,
+                 activation_started=None, input_tracker=None, detector=None, detect_executor=None,
+                 analysis_mode=ANALYSIS_MODE):
         super().__init__()
         self.user_id = user_id
         self.lock_callback = lock_callback
         self.status_callback = status_callback
         self.frame_callback = frame_callback
+        # event_callback(event_type, detail, value) feeds the security journal; must not block
+        self.event_callback = event_callback
         self.running = False
         self.is_locked = False
+        self.locked_at = None
         self.consecutive_unknowns = 0
-        self.last_verified_time = 0
+        self.last_verified_time = float("-inf")
         self.debug_info = "Ready"
         
-        # Load Resources
-        self.recognizer = cv2.face.LBPHFaceRecognizer_create()
-        try:
-            self.recognizer.read(TRAINER_PATH)
-            self.model_loaded = True
-        except:
-            print("WARNING: Model not found. Sentinel running in Detection Only mode.")
-            self.model_loaded = False
-            
-        self.face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+        # Resources come warm from the process-wide model cache; see load_resources()
+        self.recognizer = None
+        self.model_loaded = False
+        # A supervisor may hand in a shared detector and run detection on its worker pool
+        self.detector = detector
+        self.detect_executor = detect_executor
+        # "process": detection/recognition run in an AnalysisWorker; lock rules stay here
+        self.analysis_mode = analysis_mode
+        self.worker = None
+        self.tracker = None
+        self.recognition = None
+        self.resources_ready = False
+        # Faces detected but not yet recognized because the per-frame budget ran out
+        self.pending_faces = []
+
+        # Static scenes reuse the last analyzed result instead of re-running detection
+        self.motion = MotionGate() if MOTION_GATE_ENABLED else None
+        self.last_faces = []
+        # Track ids recognized in the latest analysis; only these advance the intruder streak
+        self.fresh_predictions = set()
         
-        # Timers
-        self.last_face_seen_time = time.time()
-        self.last_input_time = time.time()
+        # Timers (monotonic, so wall-clock changes cannot stretch or skip a timeout)
+        self.last_face_seen_time = time.monotonic()
         self.absence_events = 0
         self.start_time = None
 
-        # Input Listeners
-        self.mouse_listener = mouse.Listener(on_move=self.on_input, on_click=self.on_input, on_scroll=self.on_input)
-        self.key_listener = keyboard.Listener(on_press=self.on_input)
+        # Capture stage (shared camera by default; files/synthetic for headless runs)
+        self.frame_source = frame_source or SharedCameraSource()
+        self.grabber = None
+        self.frames_read = 0
+
+        # Recent frames for breach evidence; written asynchronously on lock
+        self.evidence = EvidenceRecorder()
+
+        # Hot-path timings (no-ops when disabled)
+        self.timings = StageStats(enabled=collect_stats)
+        self.frames_analyzed = 0
+
+        # Login -> first analyzed frame, when the caller tells us when login started (monotonic)
+        self.activation_started = activation_started
+        self.activation_latency = None
 
-    def on_input(self, *args):
-        self.last_input_time = time.time()
+        # Adaptive loop rate (idle / fast / locked)
+        self.scheduler = DetectionScheduler()
+        self.user_verified = False
+
+        # Input activity (hooks optional so the loop can run without a desktop session;
+        # a supervisor passes a view of one shared tracker instead)
+        self.input = input_tracker or InputActivityTracker(hooks=input_hooks)
+
+    def load_resources(self):
+        """Fetch the cascade and this user's recognizer (instant when preloaded during login)"""
+        cache = get_model_cache()
+        try:
+            self.recognizer = cache.recognizer(self.user_id)
+        except (cv2.error, OSError, ValueError) as e:
+            print(f"WARNING: Model failed to load ({e}).")
+            self.recognizer = None
+        self.model_loaded = self.recognizer is not None
+        if not self.model_loaded:
+            print("WARNING: Model not found. Sentinel running in Detection Only mode.")
+        
+        if self.detector is None:
+            self.detector = FaceDetector(scale_factor=1.2, min_neighbors=5, cascade=cache.cascade())
+        if TRACKING_ENABLED:
+            self.tracker = FaceTracker(self.detector.detect)
+            self.recognition = RecognitionBudget()
+        else:
+            # Full detection and recognition on every frame (no identities carried over, so no budget)
+            self.tracker = FaceTracker(self.detector.detect, redetect_interval=1, reuse_identity=False)
+            self.recognition = RecognitionBudget(max_faces=0, budget_ms=0)
+        if self.analysis_mode == "process":
+            from .analysis_worker import AnalysisWorker
+            from .auth_manager import AuthManager
+            self.worker = AnalysisWorker(AuthManager.recognizer_path(self.user_id) if self.model_loaded else None,
+                                         user_id=self.user_id)
+        self.resources_ready = True
+
+    @property
+    def last_input_time(self):
+        return self.input.last_input_time
 
     def run(self):
         self.running = True
         self.start_time = time.time()
-        self.mouse_listener.start()
-        self.key_listener.start()
+        self.input.start()
+        if not self.resources_ready:
+            self.load_resources()
         
-        video_capture = cv2.VideoCapture(CAMERA_INDEX, cv2.CAP_DSHOW)
+        # Capture runs on its own thread and only ever hands over the newest frame
+        self.grabber = FrameGrabber(self.frame_source, timings=self.timings)
+        self.grabber.start()
         
         while self.running:
             # We CONTINUE reading frames even if locked, to support "Biometric Unlock" check.
             
-            ret, frame = video_capture.read()
-            if not ret:
-                print("Warning: Camera read failed. Retrying...")
-                time.sleep(1)
+            started = self.timings.now()
+            frame = self.grabber.slot.get(timeout=1.0)
+            if frame is None:
+                if self.grabber.slot.closed:
+                    print("[Sentinel] Frame source exhausted.")
+                    break
                 continue
 
-            # WARMUP: Skip first 30 frames (~1-2s) to let camera exposure settle
-            frames_read = getattr(self, "frames_read", 0) + 1
-            self.frames_read = frames_read
-            if frames_read < 30:
+            # WARMUP: Skip first frames (~1-2s on a camera) to let exposure settle
+            self.frames_read += 1
+            if self.frames_read < self.frame_source.warmup_frames:
                  self.debug_info = "Camera Warmup..."
                  if self.frame_callback: self.frame_callback(frame)
                  continue
 
-            if self.frame_callback:
-                self.frame_callback(frame)
+            self.timings.record("frame_read", started)
 
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.2, 5)
+            iteration_started = time.monotonic()
+            self.process_frame(frame)
 
-            # Instance variable to be accessed by UI
-            self.current_face_is_authorized = False
-            unauthorized_face_detected = False
-            
-            if len(faces) > 0:
-                for (x,y,w,h) in faces:
-                    if self.model_loaded:
-                        id_, confidence = self.recognizer.predict(gray[y:y+h,x:x+w])
-                        
-                        self.debug_info = f"ID:{id_} Conf:{int(confidence)}"
-                        
-                        # STRICT SECURITY LOGIC:
-                        if confidence < CONFIDENCE_THRESHOLD and id_ == self.user_id:
-                            self.current_face_is_authorized = True
-                            self.debug_info += " [MATCH]"
-                        else:
-                            unauthorized_face_detected = True
-                            self.debug_info += " [INTRUDER]"
-                    else:
-                        # Fallback (No model loaded yet)
-                        self.current_face_is_authorized = True 
-            else:
-                self.debug_info = "No Face Detected" 
+            self.scheduler.select(self.is_locked, self.user_verified, iteration_started)
+            self.scheduler.wait(iteration_started)
 
-            now = time.time()
-            
-            # --- UPDATE VERIFICATION STATE ---
-            # Only consider user "Verified" if they are present AND NO STRANGERS are present.
-            if self.current_face_is_authorized and not unauthorized_face_detected:
-                self.last_verified_time = now
-                self.consecutive_unknowns = 0
-            
-            # --- ONLY ACT ON RULES IF NOT LOCKED ---
-            if not self.is_locked:
-                # 1. IMMEDIATE THREAT: Stranger Detected
-                if unauthorized_face_detected:
+        self.grabber.stop()
+        self.evidence.close()
+        self.input.stop()
+        if self.worker is not None:
+            self.worker.close()
+
+    def process_frame(self, frame, now=None):
+        # 'now' lets headless replays drive the lock timers on a virtual clock
+        if now is None:
+            now = time.monotonic()
+        if not self.resources_ready:
+            self.load_resources()
+
+        timings = self.timings
+        frame_started = timings.now()
+
+        if self.frame_callback:
+            started = timings.now()
+            self.frame_callback(frame)
+            timings.record("frame_callback", started)
+
+        started = timings.now()
+        # Wall clock, like the lock time capture() records (now is monotonic)
+        self.evidence.add_frame(frame)
+        timings.record("evidence_buffer", started)
+
+        started = timings.now()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        timings.record("color_convert", started)
+
+        # Faces still waiting on the recognition budget always get a fresh pass
+        analyze = True
+        if self.motion is not None:
+            started = timings.now()
+            # ...and so does a suspected intruder, whose streak only grows on fresh predictions
+            analyze = self.motion.should_analyze(gray, now, force=bool(self.pending_faces) or self.consecutive_unknowns > 0)
+            timings.record("motion_gate", started)
+        if analyze:
+            faces = None
+            if self.worker is not None:
+                faces = self._analyze_in_worker(gray, now)
+            if faces is None:
+                if self.detect_executor is not None:
+                    faces = self.detect_executor.submit(self._detect_and_identify, gray, now).result()
+                else:
+                    faces = self._detect_and_identify(gray, now)
+            self.last_faces = faces
+        else:
+            faces = self.last_faces
+            self.fresh_predictions = set()
+
+        # Instance variable to be accessed by UI
+        self.current_face_is_authorized = False
+        unauthorized_face_detected = False
+        fresh_intruder = False
+        
+        if len(faces) > 0:
+            for track in faces:
+                if self.model_loaded:
+                    if track.identity is None:
+                        # Over budget this frame: neither proof of the user nor of an intruder
+                        continue
+                    id_, confidence = track.identity
+                    
+                    self.debug_info = f"ID:{id_} Conf:{int(confidence)}"
+                    
+                    # STRICT SECURITY LOGIC:
+                    if confidence < CONFIDENCE_THRESHOLD and id_ == self.user_id:
+                        self.current_face_is_authorized = True
+                        self.debug_info += " [MATCH]"
+                    else:
+                        unauthorized_face_detected = True
+                        fresh_intruder = fresh_intruder or track.track_id in self.fresh_predictions
+                        self.debug_info += " [INTRUDER]"
+                else:
+                    # Fallback (No model loaded yet)
+                    self.current_face_is_authorized = True 
+            if self.model_loaded and self.pending_faces:
+                self.debug_info += f" (+{len(self.pending_faces)} pending)"
+        else:
+            self.debug_info = "No Face Detected" 
+        
+        # --- UPDATE VERIFICATION STATE ---
+        # Only consider user "Verified" if they are present AND NO STRANGERS (or unchecked faces) are present.
+        self.user_verified = (self.current_face_is_authorized and not unauthorized_face_detected
+                              and not (self.model_loaded and self.pending_faces))
+        if self.user_verified:
+            self.last_verified_time = now
+            self.consecutive_unknowns = 0
+        
+        # Coalesced input counters; mouse hooks only while the absence window can open
+        self.input.sample(now)
+        self.input.update_arming(self.user_verified, now)
+        
+        # --- ONLY ACT ON RULES IF NOT LOCKED ---
+        started = timings.now()
+        if not self.is_locked:
+            # 1. IMMEDIATE THREAT: Stranger Detected
+            if unauthorized_face_detected:
+                # Counted per fresh prediction, so a reused result cannot lock on its own
+                if fresh_intruder:
                     self.consecutive_unknowns += 1
                     print(f"[Sentinel] Warning: Unauthorized Person x{self.consecutive_unknowns}")
-                    
-                    # Lock faster for intruders (e.g. ~1 second / 10 frames)
-                    if self.consecutive_unknowns > 10: 
-                        self.trigger_lock("SECURITY ALERT: Unauthorized Person!", frame)
+                    if self.consecutive_unknowns == 1:
+                        self.emit_event(EVENT_INTRUDER, self.debug_info)
                 
-                # 2. SAFE STATE: User Present & No Strangers
-                elif self.current_face_is_authorized:
-                    self.last_face_seen_time = now
+                # Lock faster for intruders (~0.5 second / 10 frames at the fast rate)
+                if self.consecutive_unknowns > 10: 
+                    self.trigger_lock("SECURITY ALERT: Unauthorized Person!", frame, EVENT_LOCK_INTRUDER)
+            
+            # 2. SAFE STATE: User Present & No Strangers
+            elif self.current_face_is_authorized:
+                self.last_face_seen_time = now
+                # Unchecked faces neither count toward nor clear the intruder streak
+                if not self.pending_faces:
                     self.consecutive_unknowns = 0
-                    self.status_callback(f"Active - Verified User (Faces: {len(faces)})")
+                self.status_callback(f"Active - Verified User (Faces: {len(faces)})")
+            
+            # 3. ABSENCE / GHOST INPUT
+            else:
+                # User is gone (and no strangers detected either, just empty or failures)
+                # We don't increment consecutive_unknowns here to avoid mixing "no face" with "intruder"
                 
-                # 3. ABSENCE / GHOST INPUT
-                else:
-                    # User is gone (and no strangers detected either, just empty or failures)
-                    # We don't increment consecutive_unknowns here to avoid mixing "no face" with "intruder"
-                    
-                    if (now - self.last_face_seen_time) > GHOST_INPUT_THRESHOLD:
-                        # Check for strict timeout first
-                        from .config import ABSENCE_LOCK_TIMEOUT
-                        if (now - self.last_face_seen_time) > ABSENCE_LOCK_TIMEOUT:
-                            self.trigger_lock(f"Auto-Lock: Absent for > {ABSENCE_LOCK_TIMEOUT}s", frame)
-
-                        # Check for Ghost Input
-                        elif (now - self.last_input_time) < 1.0: 
-                            self.trigger_lock("Ghost Input Detected!", frame)
-                        else:
-                            self.status_callback("Idling - No User")
+                if (now - self.last_face_seen_time) > GHOST_INPUT_THRESHOLD:
+                    # Check for strict timeout first
+                    from .config import ABSENCE_LOCK_TIMEOUT
+                    if (now - self.last_face_seen_time) > ABSENCE_LOCK_TIMEOUT:
+                        self.trigger_lock(f"Auto-Lock: Absent for > {ABSENCE_LOCK_TIMEOUT}s", frame, EVENT_LOCK_ABSENCE)
+
+                    # Check for Ghost Input
+                    elif self.input.events_in(now, 1.0) >= GHOST_INPUT_MIN_EVENTS: 
+                        self.emit_event(EVENT_GHOST_INPUT, f"No face for {now - self.last_face_seen_time:.1f}s",
+                                        self.input.rate(now))
+                        self.trigger_lock("Ghost Input Detected!", frame, EVENT_LOCK_GHOST_INPUT)
                     else:
-                        self.status_callback("Idling - Warning")
+                        self.status_callback("Idling - No User")
+                else:
+                    self.status_callback("Idling - Warning")
+
+        timings.record("lock_logic", started)
+        timings.record("frame_total", frame_started)
+        self.frames_analyzed += 1
+        if self.activation_latency is None and self.activation_started is not None:
+            self.activation_latency = time.monotonic() - self.activation_started
+            print(f"[Sentinel] Monitoring active {self.activation_latency:.2f}s after login")
+
+    def _detect_and_identify(self, gray, now=None):
+        """Tracking plus recognition for faces without a settled identity (the CPU-heavy part)"""
+        timings = self.timings
+        started = timings.now()
+        faces = self.tracker.update(gray, now)
+        timings.record("detect", started)
 
-            time.sleep(0.1)
+        fresh = set()
+        if self.model_loaded:
+            # Settled faces keep their identity; new or drifted ones share a per-frame budget
+            def predict(track):
+                x, y, w, h = track.box
+                started = timings.now()
+                label, confidence = self.recognizer.predict(gray[y:y+h,x:x+w])
+                track.set_identity(label, confidence, cacheable=self.is_confident_match(label, confidence))
+                fresh.add(track.track_id)
+                timings.record("predict", started)
+            self.pending_faces = self.recognition.run(faces, gray.shape, predict)
+        self.fresh_predictions = fresh
+        return faces
 
-        video_capture.release()
-        self.mouse_listener.stop()
-        self.key_listener.stop()
+    def is_confident_match(self, label, confidence):
+        """Only clear matches of this user are reused; strangers and borderline faces are re-checked every frame"""
+        return label == self.user_id and confidence < CONFIDENCE_THRESHOLD - IDENTITY_CACHE_MARGIN
 
-    def trigger_lock(self, reason, frame):
+    def _analyze_in_worker(self, gray, now):
+        """Worker-process analysis; None if the worker failed (the frame is then analyzed here)"""
+        started = self.timings.now()
+        faces = self.worker.analyze(gray, now)
+        if faces is None:
+            return None
+        self.timings.record("worker_roundtrip", started)
+        detect_s, predict_s = self.worker.last_worker_times
+        self.timings.add("detect", detect_s)
+        if predict_s:
+            self.timings.add("predict", predict_s)
+        self.pending_faces = [f for f in faces if f.identity is None] if self.model_loaded else []
+        self.fresh_predictions = {f.track_id for f in faces if f.fresh}
+        return faces
+
+    def trigger_lock(self, reason, frame, event_type):
         if not self.is_locked:
+            started = self.timings.now()
             self.is_locked = True
+            self.locked_at = time.monotonic()
             self.absence_events += 1
             print(f"LOCK TRIGGERED: {reason}")
+            self.emit_event(event_type, reason)
             
-            timestamp = int(time.time())
-            from .config import BREACH_DIR
-            import os
+            # Evidence is encoded on a background thread; the lock fires right away
             try:
-                filename = os.path.join(BREACH_DIR, f"breach_{timestamp}.jpg")
-                cv2.imwrite(filename, frame)
+                filename = self.evidence.capture(reason, frame, {"user_id": self.user_id, "status": self.debug_info})
                 self.lock_callback(reason, filename)
             except Exception as e:
                 print(f"Lock Error: {e}")
                 self.lock_callback(reason, "")
+            self.timings.record("lock_trigger", started)
+
+    def emit_event(self, event_type, detail=None, value=None):
+        if self.event_callback:
+            try:
+                self.event_callback(event_type, detail, value)
+            except Exception as e:
+                print(f"Event Journal Error: {e}")
+
+    def stats(self):
+        """Snapshot of per-stage timings plus loop counters"""
+        return {
+            "stages": self.timings.snapshot(),
+            "frames_analyzed": self.frames_analyzed,
+            "frames_dropped": self.frames_dropped,
+            "rate": self.current_rate,
+            "full_detections": self.tracker.full_detections if self.tracker else 0,
+            "faces_predicted": self.recognition.predicted if self.recognition else 0,
+            "faces_skipped": self.recognition.skipped if self.recognition else 0,
+            "pending_faces": len(self.pending_faces),
+            "frames_gated": self.motion.skipped if self.motion else 0,
+            "activation_latency": self.activation_latency,
+            "locked": self.is_locked,
+        }
+
+    @property
+    def current_rate(self):
+        # Name of the scheduler rate chosen for the last iteration
+        return self.scheduler.current
+
+    @property
+    def frames_dropped(self):
+        # Frames the capture stage overwrote before analysis got to them
+        return self.grabber.slot.frames_dropped if self.grabber else 0
+
+    def seconds_since_verified(self):
+        return time.monotonic() - self.last_verified_time
+
+    def seconds_locked(self):
+        return time.monotonic() - self.locked_at if self.is_locked and self.locked_at else None
 
     def stop(self):
         self.running = False
         
     def unlock(self):
         self.is_locked = False
-        self.last_face_seen_time = time.time()
+        self.last_face_seen_time = time.monotonic()
         self.consecutive_unknowns = 0
 
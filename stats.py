@@ -0,0 +1,72 @@
+import threading
+import time
+import numpy as np
+from .config import STATS_WINDOW
+
+
+class RollingHistogram:
+    """Last N samples of one stage's duration in a fixed-size ring"""
+
+    def __init__(self, size=STATS_WINDOW):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.size = size
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.count % self.size] = value
+        self.count += 1
+
+    def snapshot(self):
+        data = self.samples[:min(self.count, self.size)]
+        if len(data) == 0:
+            return {"count": self.count}
+        p50, p95 = np.percentile(data, (50, 95))
+        return {
+            "count": self.count,
+            "mean_ms": round(float(data.mean()) * 1000, 3),
+            "p50_ms": round(float(p50) * 1000, 3),
+            "p95_ms": round(float(p95) * 1000, 3),
+            "max_ms": round(float(data.max()) * 1000, 3),
+        }
+
+
+class StageStats:
+    """Per-stage timings for the Sentinel hot path
+
+    Usage: start = stats.now(); ...; stats.record("detect", start).
+    When disabled both calls are no-ops, so instrumentation can stay in place.
+    """
+
+    def __init__(self, enabled=True, window=STATS_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self._lock = threading.Lock()
+        if not enabled:
+            self.now = lambda: 0.0
+            self.record = lambda stage, start: None
+            self.add = lambda stage, seconds: None
+
+    def now(self):
+        return time.perf_counter()
+
+    def record(self, stage, start):
+        self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, elapsed):
+        """Record a duration measured elsewhere (e.g. in a worker process)"""
+        hist = self.stages.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(stage, RollingHistogram(self.window))
+        hist.add(elapsed)
+
+    def snapshot(self):
+        return {stage: hist.snapshot() for stage, hist in list(self.stages.items())}
+
+    def samples(self, stage):
+        """Raw samples currently in the ring for one stage (seconds)"""
+        hist = self.stages.get(stage)
+        if hist is None:
+            return np.zeros(0)
+        return hist.samples[:min(hist.count, hist.size)].copy()
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .config import CAMERA_INDEX, STATS_ENABLED
+from .detector import PerThreadDetector
+from .input_activity import InputActivityTracker
+from .model_cache import get_model_cache
+from .sentinel import Sentinel
+
+
+class SentinelSupervisor:
+    """Runs several Sentinel sessions (one per screen/camera) in one process
+
+    Sessions share the model cache (one recognizer per enrolled user), a detection worker
+    pool sized to the CPU with one cascade per worker thread, and a single set of input hooks.
+    Lock state, timers and callbacks stay per session.
+    """
+
+    def __init__(self, workers=None, input_hooks=True, collect_stats=STATS_ENABLED):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Detect")
+        self.detector = PerThreadDetector(scale_factor=1.2, min_neighbors=5)
+        self.input = InputActivityTracker(hooks=input_hooks)
+        self.cache = get_model_cache()
+        self.collect_stats = collect_stats
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self.started_at = None
+
+    def add_session(self, name, user_id, lock_callback, status_callback, frame_callback=None,
+                    frame_source=None, camera_index=CAMERA_INDEX, event_callback=None):
+        """Create (but do not start) a session; defaults to the shared service for camera_index"""
+        if frame_source is None:
+            from .camera_service import SharedCameraSource
+            frame_source = SharedCameraSource(index=camera_index)
+        # Load in the background now so start() does not wait on disk; the pool threads bring their own cascades
+        self.cache.preload(user_id, cascade=False)
+        sentinel = Sentinel(user_id, lock_callback, status_callback, frame_callback, frame_source,
+                            collect_stats=self.collect_stats, event_callback=event_callback,
+                            input_tracker=self.input.view(), detector=self.detector,
+                            detect_executor=self.executor)
+        with self._lock:
+            if name in self.sessions:
+                raise ValueError(f"Session '{name}' already exists")
+            self.sessions[name] = sentinel
+        return sentinel
+
+    def start(self, name=None):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        for session_name, sentinel in self._select(name):
+            if not sentinel.is_alive():
+                sentinel.start()
+
+    def remove_session(self, name, timeout=5):
+        with self._lock:
+            sentinel = self.sessions.pop(name, None)
+        if sentinel is not None:
+            sentinel.stop()
+            if sentinel.is_alive():
+                sentinel.join(timeout)
+
+    def stop(self, timeout=5):
+        for name in list(self.sessions):
+            self.remove_session(name, timeout)
+        self.executor.shutdown(wait=False)
+
+    def _select(self, name):
+        with self._lock:
+            if name is None:
+                return list(self.sessions.items())
+            return [(name, self.sessions[name])]
+
+    def stats(self):
+        """Per-session snapshots plus aggregate analysis throughput"""
+        sessions = {name: sentinel.stats() for name, sentinel in self._select(None)}
+        analyzed = sum(s["frames_analyzed"] for s in sessions.values())
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            "sessions": sessions,
+            "workers": self.workers,
+            "frames_analyzed": analyzed,
+            "analysis_fps": round(analyzed / elapsed, 1) if elapsed else None,
+            "locked": sorted(name for name, s in sessions.items() if s["locked"]),
+        }
@@ -0,0 +1,13 @@
+import importlib.util
+import os
+import sys
+
+# The app is imported as the 'src' package (see maintenance.py); load this checkout under that name
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "src" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("src", os.path.join(ROOT, "__init__.py"),
+                                                  submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["src"] = package
+    spec.loader.exec_module(package)
@@ -0,0 +1,70 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.config import SAMPLE_SIZE
+from src import lbp_recognizer
+from src.lbp_recognizer import NumpyLBPHRecognizer, chi_square
+
+needs_contrib = pytest.mark.skipif(not hasattr(cv2, "face"), reason="needs opencv-contrib-python (cv2.face)")
+
+
+def face_crop(seed, size=SAMPLE_SIZE):
+    """Smooth random texture: plenty of distinct LBP codes, few exact ties"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (size // 4, size // 4), dtype=np.uint8)
+    return cv2.resize(small, (size, size), interpolation=cv2.INTER_LINEAR)
+
+
+def opencv_model(crops, labels):
+    model = cv2.face.LBPHFaceRecognizer_create(1, 8, 8, 8)
+    model.train(list(crops), np.asarray(labels, dtype=np.int32))
+    return model
+
+
+@needs_contrib
+def test_histograms_match_opencv():
+    crop = face_crop(0)
+    ours = NumpyLBPHRecognizer().compute_histograms([crop])[0]
+    theirs = opencv_model([crop], [1]).getHistograms()[0].ravel()
+    assert ours.shape == theirs.shape
+    np.testing.assert_allclose(ours, theirs, atol=1e-6)
+
+
+@needs_contrib
+def test_predict_matches_opencv():
+    crops = [face_crop(seed) for seed in range(6)]
+    labels = [1, 1, 2, 2, 3, 3]
+    ours = NumpyLBPHRecognizer()
+    ours.train(crops, labels)
+    theirs = opencv_model(crops, labels)
+
+    for seed in range(10, 14):
+        query = face_crop(seed)
+        label, distance = ours.predict(query)
+        expected_label, expected_distance = theirs.predict(query)
+        assert label == expected_label
+        assert distance == pytest.approx(expected_distance, rel=1e-4)
+
+
+def test_chi_square_blocks_match_single_pass(monkeypatch):
+    rng = np.random.default_rng(1)
+    queries = rng.random((3, 64), dtype=np.float32)
+    gallery = rng.random((50, 64), dtype=np.float32)
+    whole = chi_square(queries, gallery)
+    # Force many small blocks
+    monkeypatch.setattr(lbp_recognizer, "CHI_SQUARE_BLOCK_BYTES", 3 * 64 * 4 * 7)
+    np.testing.assert_allclose(chi_square(queries, gallery), whole, rtol=1e-6)
+
+
+def test_remove_labels_and_update():
+    recognizer = NumpyLBPHRecognizer()
+    recognizer.train([face_crop(0), face_crop(1)], [1, 2])
+    recognizer.update([face_crop(2)], [3])
+    assert len(recognizer) == 3
+
+    assert recognizer.remove_labels([2]) == 1
+    assert recognizer.remove_labels([2]) == 0
+    assert list(recognizer.labels) == [1, 3]
+    assert recognizer.predict(face_crop(2))[0] == 3
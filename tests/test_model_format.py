@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.model_format import write_model, read_model, is_binary_model, ALIGN
+
+
+def sample_model(count=5, dims=256):
+    rng = np.random.default_rng(0)
+    histograms = rng.random((count, dims), dtype=np.float32)
+    labels = np.arange(count, dtype=np.int32) + 10
+    return histograms, labels
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_round_trip(tmp_path, mmap):
+    path = str(tmp_path / "trainer.lbph")
+    histograms, labels = sample_model()
+    write_model(path, histograms, labels, radius=2, neighbors=8, grid_x=4, grid_y=6, size=100, threshold=80.0)
+
+    assert is_binary_model(path)
+    params, read_histograms, read_labels = read_model(path, mmap=mmap)
+    assert params == {"radius": 2, "neighbors": 8, "grid_x": 4, "grid_y": 6, "size": 100, "threshold": 80.0}
+    np.testing.assert_array_equal(read_histograms, histograms)
+    np.testing.assert_array_equal(read_labels, labels)
+    if mmap:
+        # Both arrays are mapped straight from aligned offsets
+        assert read_histograms.offset % ALIGN == 0
+        assert read_labels.offset % ALIGN == 0
+
+
+def test_empty_model(tmp_path):
+    path = str(tmp_path / "empty.lbph")
+    write_model(path, np.zeros((0, 256), dtype=np.float32), np.zeros(0, dtype=np.int32))
+    _, histograms, labels = read_model(path)
+    assert histograms.shape == (0, 256)
+    assert len(labels) == 0
+
+
+def test_rejects_other_and_truncated_files(tmp_path):
+    other = tmp_path / "trainer.yml"
+    other.write_text("%YAML:1.0\n")
+    assert not is_binary_model(str(other))
+    with pytest.raises(ValueError):
+        read_model(str(other))
+
+    path = tmp_path / "trainer.lbph"
+    write_model(str(path), *sample_model())
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(ValueError):
+        read_model(str(path))
+
+
+def test_recognizer_save_and_read(tmp_path):
+    from src.lbp_recognizer import NumpyLBPHRecognizer
+    rng = np.random.default_rng(2)
+    crops = [rng.integers(0, 256, (100, 100), dtype=np.uint8) for _ in range(4)]
+    recognizer = NumpyLBPHRecognizer()
+    recognizer.train(crops, [1, 1, 2, 2])
+
+    path = str(tmp_path / "trainer.lbph")
+    recognizer.save(path)
+    loaded = NumpyLBPHRecognizer()
+    loaded.read(path)
+    np.testing.assert_array_equal(loaded.histograms, recognizer.histograms)
+    assert loaded.predict(crops[3]) == recognizer.predict(crops[3])
+
+    # Saving over the file it is mapped from unmaps it first (Windows refuses to replace a mapped file)
+    loaded.save(path)
+    assert not isinstance(loaded.histograms, np.memmap)
+    loaded.update(crops[:1], [3])
+    loaded.save(path)
+    reloaded = NumpyLBPHRecognizer()
+    reloaded.read(path)
+    assert list(reloaded.labels) == [1, 1, 2, 2, 3]
@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.sample_store import SampleStore, normalize_crop
+
+
+def make_store(tmp_path, size=32):
+    return SampleStore(str(tmp_path / "samples.bin"), str(tmp_path / "samples_index.npy"), size=size)
+
+
+def crops(count, seed, shape=(48, 40)):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, shape, dtype=np.uint8) for _ in range(count)]
+
+
+def test_normalize_crop():
+    color = np.zeros((60, 50, 3), dtype=np.uint8)
+    out = normalize_crop(color, 32)
+    assert out.shape == (32, 32)
+    assert out.dtype == np.uint8
+
+
+def test_append_load_and_reopen(tmp_path):
+    store = make_store(tmp_path)
+    assert store.append(1, crops(3, 0)) == 3
+    assert store.append(2, crops(2, 1)) == 2
+
+    faces, labels = store.load()
+    assert faces.shape == (5, 32, 32)
+    assert list(labels) == [1, 1, 1, 2, 2]
+    np.testing.assert_array_equal(faces[0], normalize_crop(crops(3, 0)[0], 32))
+    assert list(store.records(1)["sample_id"]) == [0, 1, 2]
+
+    reopened = make_store(tmp_path)
+    assert reopened.user_ids() == [1, 2]
+    np.testing.assert_array_equal(reopened.load(2)[0], store.load(2)[0])
+
+
+def test_read_selected_rows(tmp_path):
+    store = make_store(tmp_path)
+    store.append(1, crops(4, 0))
+    store.append(2, crops(4, 1))
+    faces, _ = store.load()
+
+    picked = store.positions(2)[[3, 1]]
+    # Rows come back in index order
+    np.testing.assert_array_equal(store.read(picked), faces[[5, 7]])
+
+
+def test_remove_and_compact(tmp_path):
+    store = make_store(tmp_path)
+    store.append(1, crops(3, 0))
+    store.append(2, crops(2, 1))
+    kept, _ = store.load(2)
+
+    assert store.remove_user(1) == 3
+    assert store.remove_user(1) == 0
+    assert store.user_ids() == [2]
+    assert store.compact() == 3 * 32 * 32
+    assert len(store.index) == 2
+
+    reopened = make_store(tmp_path)
+    np.testing.assert_array_equal(reopened.load()[0], kept)
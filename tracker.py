@@ -0,0 +1,157 @@
+import itertools
+import time
+from .config import TRACK_REDETECT_SECONDS, TRACK_REDETECT_INTERVAL, TRACK_SEARCH_MARGIN, TRACK_MAX_DRIFT, TRACK_REVERIFY_FRAMES
+
+
+class Track:
+    """One face followed across frames, with the identity it was last recognized as"""
+    _ids = itertools.count(1)
+
+    def __init__(self, box):
+        self.track_id = next(Track._ids)
+        self.box = tuple(int(v) for v in box)
+        self.age = 0
+        # (label, confidence) from the recognizer, and the box it was computed on
+        self.identity = None
+        self.identity_box = None
+        self.identity_age = 0
+        # False for identities that only hold for the frame they were predicted on
+        self.cacheable = False
+        # Consecutive frames this face waited for recognition because the budget ran out
+        self.skipped = 0
+
+    def set_identity(self, label, confidence, cacheable=True):
+        self.identity = (label, confidence)
+        self.cacheable = cacheable
+        self.identity_box = self.box
+        self.identity_age = 0
+        self.skipped = 0
+
+    def clear_identity(self):
+        self.identity = None
+        self.identity_box = None
+
+    def drift(self):
+        """Centre displacement since recognition, relative to the face size then"""
+        if self.identity_box is None:
+            return 0.0
+        x, y, w, h = self.box
+        ax, ay, aw, ah = self.identity_box
+        dx = (x + w / 2) - (ax + aw / 2)
+        dy = (y + h / 2) - (ay + ah / 2)
+        scale = max(aw, ah, 1)
+        size_change = abs(w - aw) / scale
+        return max((dx * dx + dy * dy) ** 0.5 / scale, size_change)
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+class FaceTracker:
+    """Runs full-frame detection every few frames and cheap windowed searches in between"""
+
+    def __init__(self, detect_fn, redetect_interval=TRACK_REDETECT_INTERVAL, search_margin=TRACK_SEARCH_MARGIN,
+                 max_drift=TRACK_MAX_DRIFT, reverify_frames=TRACK_REVERIFY_FRAMES, reuse_identity=True,
+                 redetect_seconds=TRACK_REDETECT_SECONDS):
+        # detect_fn(gray, min_size=None, max_size=None) -> iterable of (x, y, w, h)
+        self.detect_fn = detect_fn
+        self.redetect_interval = max(1, redetect_interval)
+        self.search_margin = search_margin
+        self.max_drift = max_drift
+        self.reverify_frames = reverify_frames
+        self.reuse_identity = reuse_identity
+        self.redetect_seconds = redetect_seconds
+        self.tracks = []
+        self.frames_since_full = 0
+        self.last_full_time = None
+        self.full_detections = 0
+        self.window_detections = 0
+
+    def update(self, gray, now=None):
+        """Advance all tracks to this frame and return the live ones"""
+        if now is None:
+            now = time.monotonic()
+        self.frames_since_full += 1
+        # Windowed searches only follow known faces; new ones appear at the next full detection
+        need_full = (not self.tracks or self.frames_since_full >= self.redetect_interval
+                     or (self.redetect_seconds is not None and now - self.last_full_time >= self.redetect_seconds))
+
+        if not need_full:
+            for track in self.tracks:
+                box = self._search_window(gray, track.box)
+                if box is None:
+                    # Lost a face: fall back to a full detection this frame
+                    need_full = True
+                    break
+                track.box = box
+
+        if need_full:
+            self._full_detection(gray)
+            self.last_full_time = now
+
+        for track in self.tracks:
+            track.age += 1
+            if track.identity is not None:
+                track.identity_age += 1
+                if (not self.reuse_identity or not track.cacheable or track.drift() > self.max_drift
+                        or track.identity_age > self.reverify_frames):
+                    track.clear_identity()
+        return self.tracks
+
+    def reset(self):
+        self.tracks = []
+        self.frames_since_full = 0
+        self.last_full_time = None
+
+    def _full_detection(self, gray):
+        self.full_detections += 1
+        self.frames_since_full = 0
+        boxes = [tuple(int(v) for v in b) for b in self.detect_fn(gray)]
+
+        # Greedy IoU matching keeps identities of faces that were already tracked
+        matched = []
+        unused = list(self.tracks)
+        for box in boxes:
+            best, best_iou = None, 0.3
+            for track in unused:
+                overlap = _iou(box, track.box)
+                if overlap > best_iou:
+                    best, best_iou = track, overlap
+            if best is not None:
+                unused.remove(best)
+                best.box = box
+                matched.append(best)
+            else:
+                matched.append(Track(box))
+        self.tracks = matched
+
+    def _search_window(self, gray, box):
+        self.window_detections += 1
+        x, y, w, h = box
+        pad_x = int(w * self.search_margin)
+        pad_y = int(h * self.search_margin)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        # Only look for a face of roughly the same size as last time
+        size = max(w, h)
+        min_side = max(1, int(size * 0.7))
+        max_side = int(size * 1.4)
+        candidates = self.detect_fn(gray[y0:y1, x0:x1], min_size=(min_side, min_side), max_size=(max_side, max_side))
+        if len(candidates) == 0:
+            return None
+
+        cx, cy = x + w / 2, y + h / 2
+        best = min(candidates, key=lambda b: (x0 + b[0] + b[2] / 2 - cx) ** 2 + (y0 + b[1] + b[3] / 2 - cy) ** 2)
+        bx, by, bw, bh = (int(v) for v in best)
+        return (x0 + bx, y0 + by, bw, bh)
@@ -2,6 +2,9 @@ import tkinter as tk
 from tkinter import messagebox
 import sys
 import os
+import time
+import queue
+import threading
 
 # Try to enable High DPI visibility on Windows
 try:
@@ -47,6 +50,9 @@ class MedGuardApp(tk.Tk):
             self.auth = AuthManager()
             self.sentinel = None
             self.current_user = None
+            self.session_id = None
+            self.preview = None
+            self.enrollment = None
             
             print("DEBUG: Managers Initialized")
             
@@ -54,6 +60,12 @@ class MedGuardApp(tk.Tk):
             messagebox.showerror("Init Error", f"Failed to load modules: {e}")
             return
 
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Stop rendering the preview while minimized
+        self.bind("<Unmap>", self.on_window_state)
+        self.bind("<Map>", self.on_window_state)
+
         # 4. Remove Loading and Show Login
         self.loading_label.destroy()
         self.show_login()
@@ -74,6 +86,9 @@ class MedGuardApp(tk.Tk):
         tk.Label(form, text="Employee ID", font=("Segoe UI", 10, "bold"), bg=CARD_COLOR, fg=FG_COLOR).pack(anchor="w")
         self.login_eid = tk.Entry(form, font=("Segoe UI", 12), width=30, bg="#333333", fg="white", insertbackground="white", relief="flat")
         self.login_eid.pack(pady=(5, 20), ipady=5)
+        # Start loading the user's model while they type the password
+        self.login_eid.bind("<FocusOut>", self.preload_user_model)
+        self.login_eid.bind("<Return>", self.preload_user_model)
         
         tk.Label(form, text="Password", font=("Segoe UI", 10, "bold"), bg=CARD_COLOR, fg=FG_COLOR).pack(anchor="w")
         self.login_pass = tk.Entry(form, font=("Segoe UI", 12), show="•", width=30, bg="#333333", fg="white", insertbackground="white", relief="flat")
@@ -83,6 +98,41 @@ class MedGuardApp(tk.Tk):
         tk.Button(self, text="LOGIN", font=("Segoe UI", 12, "bold"), bg=ACCENT_COLOR, fg="white", width=25, relief="flat", command=self.do_login).pack(pady=20)
         tk.Button(self, text="Create New Account", font=("Segoe UI", 10), bg=BG_COLOR, fg=FG_COLOR, activebackground=BG_COLOR, activeforeground=ACCENT_COLOR, relief="flat", command=self.show_signup).pack()
 
+        self.model_status_label = tk.Label(self, text="", font=("Segoe UI", 9), bg=BG_COLOR, fg="#888888")
+        self.model_status_label.pack(pady=10)
+        self.preload_uid = None
+        
+        from .model_cache import get_model_cache
+        get_model_cache().preload_cascade()
+        self.refresh_model_status()
+
+    def preload_user_model(self, event=None):
+        eid = self.login_eid.get().strip()
+        if not eid:
+            return
+        try:
+            user = self.db.get_user_by_id(eid)
+        except Exception:
+            return
+        if user:
+            from .model_cache import get_model_cache
+            self.preload_uid = user[0]
+            get_model_cache().preload(user[0])
+
+    def refresh_model_status(self):
+        if not (self.model_status_label and self.model_status_label.winfo_exists()):
+            return
+        from .model_cache import get_model_cache
+        status = get_model_cache().status(self.preload_uid)
+        text = {"ready": "Sentinel ready", "loading": "Loading face model...", "failed": "Face model unavailable",
+                "no_model": "No face model - detection only"}[status]
+        if self.preload_uid is None and status == "ready":
+            text = "Detector ready"
+        color = {"ready": SUCCESS_COLOR, "no_model": WARNING_COLOR}.get(status, "#888888")
+        self.model_status_label.config(text=text, fg=color)
+        if status == "loading" or self.preload_uid is None:
+            self.after(250, self.refresh_model_status)
+
     def show_signup(self):
         self.clear_screen()
         
@@ -107,6 +157,8 @@ class MedGuardApp(tk.Tk):
         tk.Button(self, text="Back to Login", bg=BG_COLOR, fg=FG_COLOR, relief="flat", command=self.show_login).pack()
 
     def start_training(self):
+        if self.enrollment is not None:
+            return
         name = self.reg_name.get()
         eid = self.reg_eid.get()
         pwd = self.reg_pass.get()
@@ -115,7 +167,6 @@ class MedGuardApp(tk.Tk):
             messagebox.showwarning("Required", "Fill all fields")
             return
             
-        import cv2
         self.cap_lbl = tk.Label(self, text="Opening Camera...", font=("Segoe UI", 16), fg="red", bg=BG_COLOR)
         self.cap_lbl.pack(pady=10)
         self.update()
@@ -130,84 +181,110 @@ class MedGuardApp(tk.Tk):
              self.cap_lbl.destroy()
              return
 
-        from PIL import Image, ImageTk
-
         # Setup Preview Label
         self.preview_lbl = tk.Label(self, bg="black")
         self.preview_lbl.pack(pady=10)
         
-        try:
-            cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            if not cap.isOpened():
-                raise Exception("Cannot open camera")
-                
-            images = []
-            
-            # Capture 50 frames (approx 3-5 seconds depending on speed)
-            for i in range(50):
-                ret, frame = cap.read()
-                if ret:
-                    images.append(frame)
-                    
-                    # Live Preview Update
-                    # Convert BGR to RGB
-                    cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-                    img = Image.fromarray(cv2image)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    
-                    self.preview_lbl.imgtk = imgtk # Keep ref
-                    self.preview_lbl.configure(image=imgtk)
-                    self.cap_lbl.config(text=f"Scanning... {i*2}%")
-                    self.update()
-                else:
-                    break
-            
-            cap.release()
-            self.preview_lbl.destroy() # Remove preview
-            
-            if len(images) < 10:
-                self.db.delete_user(uid)
-                messagebox.showerror("Error", "Camera failed to capture enough frames.")
-                self.cap_lbl.destroy()
-                return
-
-            self.cap_lbl.config(text="Processing Model...")
-            self.update()
-            
-            # Train
-            AuthManager.save_face_samples(uid, name, images)
-            if AuthManager.train_recognizer():
-                # Save Audit Log Image
-                try:
-                    from .config import SIGNUP_LOG_DIR
-                    import os
-                    import time
-                    import cv2
-                    timestamp = int(time.time())
-                    safe_name = "".join(x for x in name if x.isalnum())
-                    log_path = os.path.join(SIGNUP_LOG_DIR, f"signup_{timestamp}_{safe_name}.jpg")
-                    if len(images) > 0:
-                        cv2.imwrite(log_path, images[0])
-                except Exception as e:
-                    print(f"Failed to save signup log: {e}")
-
-                self.cap_lbl.destroy()
-                messagebox.showinfo("Done", "Registered!")
-                self.show_login()
+        # Capture, quality checks and training run on the worker; we only poll its progress
+        from .enrollment import EnrollmentWorker
+        self.enrollment = EnrollmentWorker(uid)
+        self.enrollment.start()
+        self.poll_enrollment(uid, name)
+
+    def poll_enrollment(self, uid, name):
+        worker = self.enrollment
+        if worker is None:
+            return
+        hints = {"no_face": "Face the camera", "multiple_faces": "Only one person in view",
+                 "pose": "Center your face", "blur": "Hold still", "exposure": "Improve lighting",
+                 "duplicate": "Move your head slightly"}
+        done = None
+        latest = None
+        while True:
+            try:
+                msg = worker.updates.get_nowait()
+            except queue.Empty:
+                break
+            if msg["type"] == "done":
+                done = msg
             else:
-                messagebox.showerror("Error", "Training Failed")
-                self.db.delete_user(uid)
-                self.cap_lbl.destroy()
-                self.show_signup()
-            
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-            if 'uid' in locals():
-                self.db.delete_user(uid)
-            if hasattr(self, 'cap_lbl'): self.cap_lbl.destroy()
-            if hasattr(self, 'preview_lbl'): self.preview_lbl.destroy()
+                latest = msg
+        
+        if latest is not None and self.preview_lbl.winfo_exists():
+            import cv2
+            from PIL import Image, ImageTk
+            img = Image.fromarray(cv2.cvtColor(latest["preview"], cv2.COLOR_BGR2RGB))
+            imgtk = ImageTk.PhotoImage(image=img)
+            self.preview_lbl.imgtk = imgtk # Keep ref
+            self.preview_lbl.configure(image=imgtk)
+            pct = min(100, int(100 * latest["accepted"] / latest["target"]))
+            hint = hints.get(latest["rejected"], "Good")
+            if latest["accepted"] >= latest["target"] and latest["rejected"] is None:
+                hint = "Turn slightly for more angles"
+            self.cap_lbl.config(text=f"Scanning... {pct}%  ({hint})")
+        
+        if done is None:
+            self.after(30, lambda: self.poll_enrollment(uid, name))
+            return
+        
+        self.enrollment = None
+        print(f"Enrollment: {done['samples']} samples / {done['frames']} frames in {done['seconds']:.1f}s, rejected {done['rejected']}")
+        if self.preview_lbl.winfo_exists(): self.preview_lbl.destroy()
+        if self.cap_lbl.winfo_exists(): self.cap_lbl.destroy()
+        
+        if done["ok"]:
+            # Save Audit Log Image
+            try:
+                from .config import SIGNUP_LOG_DIR
+                import cv2
+                timestamp = int(time.time())
+                safe_name = "".join(x for x in name if x.isalnum())
+                log_path = os.path.join(SIGNUP_LOG_DIR, f"signup_{timestamp}_{safe_name}.jpg")
+                if worker.audit_frame is not None:
+                    cv2.imwrite(log_path, worker.audit_frame)
+            except Exception as e:
+                print(f"Failed to save signup log: {e}")
+
+            messagebox.showinfo("Done", "Registered!")
+            self.show_login()
+        else:
+            self.rollback_enrollment(uid, done)
+            messagebox.showerror("Error", f"Training Failed: {done['error']}")
+            self.show_signup()
+
+    def cancel_enrollment(self):
+        """Abandon a registration in progress so its result never pops up over another screen"""
+        worker, self.enrollment = self.enrollment, None
+        if worker is not None:
+            worker.cancel()
+            self.discard_enrollment(worker)
+
+    def discard_enrollment(self, worker):
+        # The worker may be mid-training; wait for its result, then roll back unless it completed
+        done = None
+        while done is None:
+            try:
+                msg = worker.updates.get_nowait()
+            except queue.Empty:
+                break
+            if msg["type"] == "done":
+                done = msg
+        if done is None:
+            self.after(100, lambda: self.discard_enrollment(worker))
+            return
+        if not done["ok"]:
+            self.rollback_enrollment(worker.user_id, done)
+
+    def rollback_enrollment(self, uid, done):
+        """Undo a failed registration: the user row always, stored samples only if the worker got that far"""
+        self.db.delete_user(uid)
+        if done["saved"]:
+            # Touches the sample index and shard files, so keep it off the Tk thread
+            from .auth_manager import AuthManager
+            threading.Thread(target=AuthManager.forget_user, args=(uid,), name="ForgetUser").start()
 
     def do_login(self):
+        login_started = time.monotonic()
         eid = self.login_eid.get()
         pwd = self.login_pass.get()
         
@@ -216,7 +293,7 @@ class MedGuardApp(tk.Tk):
             if user:
                  from .auth_manager import AuthManager
                  if AuthManager.verify_password(user[3], pwd):
-                     self.start_dashboard(user)
+                     self.start_dashboard(user, login_started)
                  else:
                      messagebox.showerror("No", "Bad Password")
             else:
@@ -224,8 +301,9 @@ class MedGuardApp(tk.Tk):
         except Exception as e:
              messagebox.showerror("Error", str(e))
 
-    def start_dashboard(self, user):
+    def start_dashboard(self, user, login_started=None):
         self.current_user = user
+        self.session_id = self.db.log_session_start(user[0])
         self.clear_screen()
         
         tk.Label(self, text=f"Welcome, {user[1]}", font=("Segoe UI", 24, "bold"), bg=BG_COLOR, fg=FG_COLOR).pack(pady=(30, 10))
@@ -241,37 +319,64 @@ class MedGuardApp(tk.Tk):
         self.feed_label = tk.Label(feed_frame, bg="black")
         self.feed_label.pack()
         
+        from .preview import PreviewPipeline
+        self.preview = PreviewPipeline(self, self.feed_label)
+        # Own camera subscription: the feed stays smooth while the sentinel idles at its slow rate
+        self.preview.start()
+        
         tk.Button(self, text="LOGOUT", command=self.do_logout, bg=WARNING_COLOR, fg="white", font=("Segoe UI", 12, "bold"), relief="flat", width=20).pack(pady=30)
         
+        from .config import STATS_OVERLAY
+        self.stats_label = None
+        if STATS_OVERLAY:
+            self.stats_label = tk.Label(self, text="", font=("Consolas", 9), bg=BG_COLOR, fg="#888888", justify="left")
+            self.stats_label.pack()
+        
         from .sentinel import Sentinel
-        self.sentinel = Sentinel(user[0], self.lockdown_trigger, lambda x: None, self.update_feed_safe)
+        if self.sentinel is not None and self.sentinel.is_alive():
+            # The previous session shares the cached cascade; it must be done with it first.
+            # Normally it exited while the password was typed, so this returns at once.
+            self.sentinel.join()
+        self.sentinel = Sentinel(user[0], self.lockdown_trigger, lambda x: None,
+                                 event_callback=self.record_event, activation_started=login_started)
         self.sentinel.start()
+        
+        if self.stats_label is not None:
+            self.refresh_stats_overlay()
 
-    def update_feed_safe(self, frame):
-        # Called from thread, schedule on main loop
-        from PIL import Image, ImageTk
-        try:
-             cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-             # Resize for dashboard (320x240)
-             cv2image = cv2.resize(cv2image, (320, 240))
-             img = Image.fromarray(cv2image)
-             imgtk = ImageTk.PhotoImage(image=img)
-             
-             # Schedule update
-             self.after(0, lambda: self._update_label(imgtk))
-        except:
-             pass
+    def refresh_stats_overlay(self):
+        # Per-stage p95 so it is obvious whether camera, cascade or UI is the bottleneck
+        if not (self.stats_label and self.stats_label.winfo_exists() and self.sentinel):
+            return
+        snap = self.sentinel.stats()
+        stages = snap["stages"]
+        parts = [f"{name} {stages[name]['p95_ms']:.1f}ms" for name in
+                 ("capture", "color_convert", "detect", "predict", "lock_logic")
+                 if "p95_ms" in stages.get(name, {})]
+        self.stats_label.config(text=f"p95: {' | '.join(parts)}\n"
+                                     f"rate: {snap['rate']}  analyzed: {snap['frames_analyzed']}  dropped: {snap['frames_dropped']}")
+        self.after(1000, self.refresh_stats_overlay)
+
+    def record_event(self, event_type, detail=None, value=None):
+        # Queued on the write-behind thread; safe to call from the sentinel loop
+        user_id = self.current_user[0] if self.current_user else None
+        self.db.log_event(event_type, session_id=self.session_id, user_id=user_id, detail=detail, value=value)
 
-    def _update_label(self, imgtk):
-        if hasattr(self, 'feed_label') and self.feed_label.winfo_exists():
-            self.feed_label.imgtk = imgtk
-            self.feed_label.configure(image=imgtk)
+    def on_window_state(self, event):
+        if event.widget is not self or not self.preview:
+            return
+        if self.state() == "iconic":
+            self.preview.pause("minimized")
+        else:
+            self.preview.resume("minimized")
 
     def lockdown_trigger(self, reason, path):
          # Simple overlay
          self.after(0, lambda: self.show_lock(reason))
 
     def show_lock(self, reason):
+        if self.preview:
+            self.preview.pause("lock")
         top = tk.Toplevel(self)
         top.attributes("-fullscreen", True)
         top.configure(bg="#000000") # Pure black for impact
@@ -293,8 +398,11 @@ class MedGuardApp(tk.Tk):
              from .auth_manager import AuthManager
              import time
              
+             from .db_manager import EVENT_UNLOCK_ATTEMPT, EVENT_UNLOCK
+             
              pwd = e.get()
              if not AuthManager.verify_password(self.current_user[3], pwd):
+                  self.record_event(EVENT_UNLOCK_ATTEMPT, "bad_password")
                   messagebox.showerror("Security Alert", "Invalid Password")
                   return
 
@@ -303,9 +411,12 @@ class MedGuardApp(tk.Tk):
              
              def attempt_biometric(start_time):
                  # Check if we have a valid face seen in the last 2 seconds
-                 if self.sentinel and ((time.time() - self.sentinel.last_verified_time) < 2.0):
+                 if self.sentinel and self.sentinel.seconds_since_verified() < 2.0:
+                     self.record_event(EVENT_UNLOCK, reason, self.sentinel.seconds_locked())
                      top.destroy()
                      self.sentinel.unlock()
+                     if self.preview:
+                         self.preview.resume("lock")
                  else:
                      # Retry for 3 seconds
                      elapsed = time.time() - start_time
@@ -318,6 +429,7 @@ class MedGuardApp(tk.Tk):
                          btn.config(state="normal", text="UNLOCK")
                          # Show last error context
                          last_status = self.sentinel.debug_info if self.sentinel else "Unknown"
+                         self.record_event(EVENT_UNLOCK_ATTEMPT, f"biometric_mismatch: {last_status}")
                          messagebox.showerror("Security Alert", f"Biometric Mismatch!\nStatus: {last_status}\n\nAuthorized User Face Required.")
 
              attempt_biometric(time.time())
@@ -328,14 +440,36 @@ class MedGuardApp(tk.Tk):
     def do_logout(self):
         if self.sentinel:
             self.sentinel.stop()
+        self.end_session()
+        if self.preview:
+            self.preview.stop()
+        self.preview = None
         self.show_login()
 
+    def end_session(self):
+        # Synchronous flush: the session record must be on disk before we move on
+        if self.session_id is not None:
+            absences = self.sentinel.absence_events if self.sentinel else 0
+            self.db.update_session_stats(self.session_id, absences)
+            self.session_id = None
+        self.db.flush()
+
     def clear_screen(self):
+        self.cancel_enrollment()
         for w in self.winfo_children():
             w.destroy()
 
     def on_close(self):
+        if getattr(self, 'enrollment', None):
+            self.enrollment.cancel()
         if hasattr(self, 'sentinel') and self.sentinel:
             self.sentinel.stop()
+        if getattr(self, 'preview', None):
+            self.preview.stop()
+        if hasattr(self, 'db'):
+            self.end_session()
+            self.db.close()
+        from .camera_service import shutdown_camera_service
+        shutdown_camera_service()
         self.destroy()
         os._exit(0)